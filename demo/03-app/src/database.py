@@ -1,6 +1,72 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import duckdb
 import ibis
 from ibis.backends.duckdb import Backend as DuckDBBackend
+from loguru import logger
+
+MOTHERDUCK_DATABASE = "washington_ferries"
+
+# Set to a file name (e.g. "washington_ferries.duckdb") to copy the MotherDuck
+# tables into a local DuckDB file and run the app's queries against it.
+DATABASE_REPLICA = os.getenv("DATABASE_REPLICA")
+
+# How often the local copy is refreshed from MotherDuck.
+DATABASE_REPLICA_REFRESH_SECONDS = float(os.getenv("DATABASE_REPLICA_REFRESH_SECONDS", 900))
+
+
+def sync_replica(path: str) -> None:
+    """
+    Copy every table of the MotherDuck database into the DuckDB file at
+    `path`. Each table is replaced in one statement, so the app sees either
+    the old or the new copy.
+    """
+    start = time.monotonic()
+    with duckdb.connect(path) as local:
+        local.execute(f"ATTACH 'md:{MOTHERDUCK_DATABASE}' AS remote (READ_ONLY)")
+        try:
+            table_names = local.execute(
+                "SELECT table_name FROM information_schema.tables"
+                " WHERE table_catalog = 'remote' AND table_schema = 'main'"
+            ).fetchall()
+            for (table_name,) in table_names:
+                local.execute(
+                    f'CREATE OR REPLACE TABLE main."{table_name}"'
+                    f' AS SELECT * FROM remote.main."{table_name}"'
+                )
+        finally:
+            local.execute("DETACH remote")
+    logger.info(f"Synced {path!r} in {time.monotonic() - start:.4f}s")
+
+
+def refresh_replica_forever(path: str) -> None:
+    while True:
+        time.sleep(DATABASE_REPLICA_REFRESH_SECONDS)
+        try:
+            sync_replica(path)
+        except Exception:
+            logger.exception(f"Failed to sync {path!r}, keeping the old copy")
+
+
+def get_replica_con(path: str) -> DuckDBBackend:
+    try:
+        sync_replica(path)
+    except Exception:
+        # a copy from an earlier run is better than no app at all
+        if not Path(path).exists():
+            raise
+        logger.exception(f"Failed to sync {path!r}, using the copy from the last run")
+    threading.Thread(
+        target=refresh_replica_forever, args=(path,), name="replica-refresh", daemon=True
+    ).start()
+    return ibis.duckdb.connect(path)
+
 
 def get_con() -> DuckDBBackend:
-    con = ibis.duckdb.connect("md:washington_ferries", read_only=True)
+    if DATABASE_REPLICA:
+        return get_replica_con(DATABASE_REPLICA)
+    con = ibis.duckdb.connect(f"md:{MOTHERDUCK_DATABASE}", read_only=True)
     return con
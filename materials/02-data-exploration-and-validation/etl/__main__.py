@@ -0,0 +1,82 @@
+"""
+Run the ETL of the reading data and the data exploration and validation
+notebooks, fetching, cleaning, validating and loading the four data sets
+concurrently where they don't depend on each other.
+
+    python -m etl
+    python -m etl --output-dir data --start-date 2024-06-01
+    python -m etl --max-workers 1  # one stage at a time, like the notebooks
+"""
+
+import argparse
+import datetime
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from etl.runner import print_report, run_stages
+from etl.fetch import Sources
+from etl.stages import build_stages, database_writer, parquet_writer
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m etl", description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--username",
+        help="Prefix of the table names (default: your Posit Connect username)",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=datetime.date.fromisoformat,
+        default=datetime.date(2024, 3, 1),
+    )
+    parser.add_argument(
+        "--end-date",
+        type=datetime.date.fromisoformat,
+        # The weather API has a 5 day delay.
+        default=datetime.date.today() - datetime.timedelta(weeks=1),
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Write parquet files to this directory instead of the database",
+    )
+    parser.add_argument("--max-workers", type=int, default=8)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if Path(".env").exists():
+        load_dotenv(override=True)
+
+    username = args.username
+    if username is None:
+        from posit.connect import Client
+
+        with Client() as client:
+            username = client.me.username
+
+    if args.output_dir:
+        write_table = parquet_writer(args.output_dir)
+    else:
+        write_table = database_writer(os.environ["DATABASE_URI_PYTHON"])
+
+    stages = build_stages(
+        Sources(),
+        username=username,
+        write_table=write_table,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    results = run_stages(stages, max_workers=args.max_workers)
+    print_report(results)
+    for result in results.values():
+        if result.error is not None:
+            print(f"{result.name} failed: {result.error}", file=sys.stderr)
+    return 0 if all(result.status == "done" for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+The fetch steps of the reading data notebook: download the four raw data
+sets from the WSDOT and Open-Meteo APIs. The notebook and the ETL pipeline
+both import them from here.
+"""
+
+import datetime
+import os
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import polars as pl
+
+WEATHER_VARIABLES = [
+    "weather_code",
+    "temperature_2m",
+    "precipitation",
+    "cloud_cover",
+    "wind_speed_10m",
+    "wind_direction_10m",
+    "wind_gusts_10m",
+]
+
+# How many times a request that was rate limited (429) is tried again.
+RATE_LIMIT_RETRIES = 3
+
+
+@dataclass
+class Sources:
+    """
+    Where the data sets are downloaded from. `transport` is passed on to
+    the httpx clients.
+    """
+
+    vessels_url: str = "https://www.wsdot.wa.gov/Ferries/API/Vessels/rest"
+    terminals_url: str = "https://www.wsdot.wa.gov/Ferries/API/terminals/rest"
+    weather_url: str = "https://archive-api.open-meteo.com/v1/"
+    wsdot_access_code: str = field(
+        default_factory=lambda: os.environ["WSDOT_ACCESS_CODE"]
+    )
+    transport: httpx.BaseTransport | None = None
+    # Used when a 429 response doesn't say when to try again.
+    rate_limit_wait_seconds: float = 60.0
+
+
+def get_json(
+    client: httpx.Client, url: str, sources: Sources, **kwargs
+) -> list | dict:
+    """
+    GET `url` and decode the JSON response, waiting and trying again when
+    the request is rate limited.
+    """
+    for _ in range(RATE_LIMIT_RETRIES):
+        response = client.get(url, **kwargs)
+        if response.status_code != 429:
+            break
+        wait = float(response.headers.get("Retry-After", sources.rate_limit_wait_seconds))
+        print(f"Rate limit exceeded for {response.url}. Waiting {wait:g} seconds...")
+        time.sleep(wait)
+    else:
+        response = client.get(url, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def _wsdot_client(base_url: str, sources: Sources) -> httpx.Client:
+    return httpx.Client(
+        base_url=base_url,
+        params={"apiaccesscode": sources.wsdot_access_code},
+        transport=sources.transport,
+    )
+
+
+def fetch_vessel_verbose(sources: Sources) -> pl.DataFrame:
+    with _wsdot_client(sources.vessels_url, sources) as client:
+        data = get_json(client, "/vesselverbose", sources)
+    return pl.DataFrame(data).unnest("Class").drop("VesselDrawingImg")
+
+
+def fetch_vessel_history(
+    sources: Sources,
+    vessel_names: list[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> pl.DataFrame:
+    vessel_history_json = []
+    with _wsdot_client(sources.vessels_url, sources) as client:
+        for vessel_name in vessel_names:
+            vessel_history_json += get_json(
+                client,
+                f"/vesselhistory/{vessel_name}/{start_date}/{end_date}",
+                sources,
+                timeout=30,
+            )
+    return pl.DataFrame(vessel_history_json)
+
+
+def fetch_terminal_locations(sources: Sources) -> pl.DataFrame:
+    with _wsdot_client(sources.terminals_url, sources) as client:
+        data = get_json(client, "/terminallocations", sources)
+    return pl.DataFrame(data).drop("DispGISZoomLoc")
+
+
+def date_ranges(
+    start_date: datetime.date, end_date: datetime.date
+) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Split `start_date` to `end_date` into ranges of at most four weeks, so
+    each weather request stays small.
+    """
+    ranges = []
+    _start_date = start_date
+    while _start_date <= end_date:
+        _end_date = min(_start_date + datetime.timedelta(weeks=4), end_date)
+        ranges.append((_start_date, _end_date))
+        _start_date = _end_date + datetime.timedelta(days=1)
+    return ranges
+
+
+def fetch_terminal_weather(
+    sources: Sources,
+    terminal_locations: pl.DataFrame,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> pl.DataFrame:
+    json_data = []
+    with httpx.Client(base_url=sources.weather_url, transport=sources.transport) as client:
+        for terminal in terminal_locations.select(
+            "Latitude", "Longitude", "TerminalName"
+        ).to_dicts():
+            for range_start, range_end in date_ranges(start_date, end_date):
+                params = {
+                    "hourly": WEATHER_VARIABLES,
+                    "start_date": str(range_start),
+                    "end_date": str(range_end),
+                    "latitude": round(terminal["Latitude"], 2),
+                    "longitude": round(terminal["Longitude"], 2),
+                }
+                _json_data = get_json(client, "/archive", sources, params=params)
+                _json_data["terminal_name"] = terminal["TerminalName"]
+                json_data.append(_json_data)
+
+    return (
+        pl.DataFrame(json_data)
+        .unnest("hourly")
+        .explode("time", *WEATHER_VARIABLES)
+        .select(pl.col("*").exclude("hourly_units"))
+    )
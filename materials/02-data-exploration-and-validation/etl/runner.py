@@ -0,0 +1,156 @@
+"""
+Run the stages of a pipeline as a dependency graph.
+
+Every stage starts as soon as the stages it depends on have finished, on a
+thread pool, so stages that don't depend on each other run at the same
+time and the total run time approaches that of the slowest chain of
+dependencies. The stages are I/O bound (HTTP requests and database writes)
+or spend their time in polars, which releases the GIL, so threads are
+enough.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import polars as pl
+from rich.console import Console
+from rich.table import Table
+
+
+@dataclass
+class Stage:
+    """
+    A step of the pipeline. `func` is called with the outputs of the stages
+    in `deps`, in that order.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = "skipped"
+    started: float | None = None
+    seconds: float | None = None
+    rows: int | None = None
+    error: BaseException | None = field(default=None, repr=False)
+
+
+def _check_graph(stages: list[Stage]) -> None:
+    names = [stage.name for stage in stages]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Stage names must be unique: {sorted(duplicates)}")
+    for stage in stages:
+        unknown = set(stage.deps) - set(names)
+        if unknown:
+            raise ValueError(f"Stage {stage.name!r} depends on unknown stages: {sorted(unknown)}")
+
+    # Kahn's algorithm: whatever is left over is part of a cycle.
+    remaining = {stage.name: set(stage.deps) for stage in stages}
+    while True:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            break
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        raise ValueError(f"Stages have circular dependencies: {sorted(remaining)}")
+
+
+def _dependents(stages: list[Stage], name: str) -> set[str]:
+    """
+    The stages that depend on `name`, directly or through other stages.
+    """
+    found: set[str] = set()
+    frontier = {name}
+    while frontier:
+        frontier = {stage.name for stage in stages if frontier & set(stage.deps)} - found
+        found |= frontier
+    return found
+
+
+def _count_rows(output: Any) -> int | None:
+    if isinstance(output, pl.DataFrame):
+        return output.height
+    if isinstance(output, list):
+        return len(output)
+    return None
+
+
+def run_stages(stages: list[Stage], max_workers: int = 8) -> dict[str, StageResult]:
+    """
+    Run `stages`, returning the result of each in the order they were
+    given. When a stage fails, the stages that depend on it, directly or
+    not, are skipped, and the rest of the pipeline carries on.
+    """
+    _check_graph(stages)
+    by_name = {stage.name: stage for stage in stages}
+    results = {stage.name: StageResult(stage.name) for stage in stages}
+    outputs: dict[str, Any] = {}
+    waiting = {stage.name for stage in stages}
+    running: dict[Future, str] = {}
+    pipeline_start = time.perf_counter()
+
+    def run_stage(stage: Stage) -> Any:
+        result = results[stage.name]
+        result.started = time.perf_counter() - pipeline_start
+        start = time.perf_counter()
+        try:
+            return stage.func(*(outputs[dep] for dep in stage.deps))
+        finally:
+            result.seconds = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as executor:
+        while waiting or running:
+            for name in sorted(waiting):
+                if all(dep in outputs for dep in by_name[name].deps):
+                    waiting.remove(name)
+                    results[name].status = "running"
+                    running[executor.submit(run_stage, by_name[name])] = name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = results[name]
+                if future.exception() is not None:
+                    result.status = "failed"
+                    result.error = future.exception()
+                    waiting -= _dependents(stages, name)
+                else:
+                    outputs[name] = future.result()
+                    result.status = "done"
+                    result.rows = _count_rows(outputs[name])
+
+    return results
+
+
+def print_report(results: dict[str, StageResult], console: Console | None = None) -> None:
+    """
+    Show when each stage started, how long it took and how many rows it
+    produced.
+    """
+    table = Table(title="Pipeline stages")
+    table.add_column("Stage")
+    table.add_column("Status")
+    table.add_column("Started (s)", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Rows", justify="right")
+    for result in sorted(results.values(), key=lambda r: (r.started is None, r.started or 0)):
+        table.add_row(
+            result.name,
+            result.status if result.error is None else f"{result.status} ({type(result.error).__name__})",
+            "" if result.started is None else f"{result.started:.2f}",
+            "" if result.seconds is None else f"{result.seconds:.2f}",
+            "" if result.rows is None else f"{result.rows:,}",
+        )
+    (console or Console()).print(table)
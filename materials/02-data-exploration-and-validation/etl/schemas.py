@@ -0,0 +1,143 @@
+"""
+The pandera schemas of the clean data sets. The notebook explains them and
+imports them from here, so it validates against the same schemas as the ETL
+pipeline.
+"""
+
+import pandera.polars as pa
+import polars as pl
+from pandera.engines.polars_engine import Date, DateTime
+
+
+class VesselHistorySchema(pa.DataFrameModel):
+    Vessel: str
+    Departing: str
+    Arriving: str
+    ScheduledDepart: DateTime = pa.Field(dtype_kwargs={"time_zone": "UTC"})
+    ActualDepart: DateTime = pa.Field(dtype_kwargs={"time_zone": "UTC"})
+    EstArrival: DateTime = pa.Field(dtype_kwargs={"time_zone": "UTC"})
+    Date: DateTime = pa.Field(
+        dtype_kwargs={"time_zone": "UTC"},
+        ge=pl.datetime(2024, 3, 1, time_zone="America/Vancouver").dt.convert_time_zone(
+            "UTC"
+        ),
+    )
+
+    @pa.dataframe_check
+    def year_of_date_matches_scheduled_depart(cls, df: pa.PolarsData) -> pl.LazyFrame:
+        """
+        Verify that the year of the Date column matches the year of the
+        ScheduledDepart column.
+        """
+        return df.lazyframe.select(
+            pl.col("Date").dt.year().eq(pl.col("ScheduledDepart").dt.year())
+        )
+
+    @pa.dataframe_check(raise_warning=True)
+    def estimated_arrival_is_after_scheduled_depart(
+        cls, df: pa.PolarsData
+    ) -> pl.LazyFrame:
+        """
+        Verify that the EstArrival date time is always after the ScheduledDepart
+        date time.
+
+        Note this check is expected to fail, therefore raise_warning=True is
+        used. In the future we should go back and understand why this check
+        fails.
+        """
+        return df.lazyframe.select(pl.col("EstArrival").ge(pl.col("ScheduledDepart")))
+
+
+def vessel_history_schema(
+    vessel_names: list[str], terminal_names: list[str]
+) -> pa.DataFrameSchema:
+    """
+    The vessel history schema plus the checks that every vessel is in the
+    vessel verbose data set and every terminal in the terminal locations
+    data set. The names are passed in, which is why validating the vessel
+    history waits for the other two data sets to be cleaned.
+    """
+    return VesselHistorySchema.to_schema().update_columns(
+        {
+            "Vessel": {"checks": [pa.Check.isin(vessel_names)]},
+            "Departing": {"checks": [pa.Check.isin(terminal_names)]},
+            "Arriving": {"checks": [pa.Check.isin(terminal_names)]},
+        }
+    )
+
+
+class VesselVerboseSchema(pa.DataFrameModel):
+    VesselID: int
+    VesselSubjectID: int
+    VesselName: str = pa.Field(unique=True)
+    VesselAbbrev: str
+    ClassID: int
+    ClassName: str
+    ClassSubjectID: int
+    DrawingImg: str
+    PublicDisplayName: str
+    SilhouetteImg: str
+    SortSeq: int
+    Status: int
+    OwnedByWSF: bool
+    CarDeckRestroom: bool
+    CarDeckShelter: bool
+    Elevator: bool
+    ADAAccessible: bool
+    MainCabinGalley: bool
+    MainCabinRestroom: bool
+    PublicWifi: bool
+    ADAInfo: str
+    AdditionalInfo: str = pa.Field(nullable=True)
+    VesselNameDesc: str
+    VesselHistory: str = pa.Field(nullable=True)
+    CityBuilt: str
+    SpeedInKnots: int
+    EngineCount: int
+    Horsepower: int
+    MaxPassengerCount: int
+    PassengerOnly: bool
+    FastFerry: bool
+    PropulsionInfo: str
+    TallDeckClearance: int
+    RegDeckSpace: int
+    TallDeckSpace: int
+    Tonnage: int
+    Displacement: int
+    YearBuilt: Date
+    YearRebuilt: Date = pa.Field(nullable=True)
+    SolasCertified: bool
+    MaxPassengerCountForInternational: int = pa.Field(nullable=True)
+    BeamInches: int
+    LengthInches: int
+    DraftInches: int = pa.Field(nullable=True)
+
+    @pa.check("DrawingImg")
+    def validate_urls(cls, data: pa.PolarsData) -> pl.LazyFrame:
+        return data.lazyframe.select(pl.col(data.key).str.starts_with("https://"))
+
+
+class TerminalLocationsSchema(pa.DataFrameModel):
+    TerminalName: str = pa.Field(unique=True)
+    TerminalAbbrev: str
+    Latitude: float = pa.Field(ge=-90.0, le=90.0)
+    Longitude: float = pa.Field(ge=-180.0, le=180.0)
+
+
+class TerminalWeatherSchema(pa.DataFrameModel):
+    latitude: float = pa.Field(ge=-90.0, le=90.0)
+    longitude: float = pa.Field(ge=-180.0, le=180.0)
+    generationtime_ms: float
+    utc_offset_seconds: int
+    timezone: str = pa.Field(eq="gmt")
+    timezone_abbreviation: str = pa.Field(eq="gmt")
+    elevation: float
+    time: DateTime = pa.Field(dtype_kwargs={"time_zone": "GMT"}, nullable=True)
+    weather_code: int
+    temperature_2m: float
+    precipitation: float
+    cloud_cover: int = pa.Field(ge=0, le=100)
+    wind_speed_10m: float
+    wind_direction_10m: int = pa.Field(ge=0, le=360)
+    wind_gusts_10m: float
+    terminal_name: str
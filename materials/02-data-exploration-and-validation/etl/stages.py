@@ -0,0 +1,445 @@
+"""
+The clean, validate and load steps of the data exploration and validation
+notebook, as functions the pipeline runner can call, and the dependency
+graph between them and the fetch steps in etl/fetch.py.
+
+The notebook explores each data set and explains the cleaning step by step,
+but the cleaning itself is only defined here, and the notebook imports it.
+"""
+
+import datetime
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from etl.fetch import (
+    Sources,
+    fetch_terminal_locations,
+    fetch_terminal_weather,
+    fetch_vessel_history,
+    fetch_vessel_verbose,
+)
+from etl.runner import Stage
+from etl.schemas import (
+    TerminalLocationsSchema,
+    TerminalWeatherSchema,
+    VesselVerboseSchema,
+    vessel_history_schema,
+)
+
+DATASETS = ["vessel_verbose", "vessel_history", "terminal_locations", "terminal_weather"]
+
+
+# Clean ----------------------------------------------------------------------
+
+
+def clean_terminal_locations(terminal_locations: pl.DataFrame) -> pl.DataFrame:
+    return terminal_locations.select(
+        pl.col("TerminalName").str.to_lowercase().str.strip_chars(),
+        pl.col("TerminalAbbrev").str.to_uppercase().str.strip_chars(),
+        pl.col("Latitude"),
+        pl.col("Longitude"),
+    )
+
+
+def clean_terminal_weather(terminal_weather: pl.DataFrame) -> pl.DataFrame:
+    return terminal_weather.with_columns(
+        pl.col("timezone").str.to_lowercase().str.strip_chars(),
+        pl.col("timezone_abbreviation").str.to_lowercase().str.strip_chars(),
+        pl.col("terminal_name").str.to_lowercase().str.strip_chars(),
+        pl.col("time").str.to_datetime(time_zone="GMT"),
+    )
+
+
+def convert_measurement_string_to_inches(series: pl.Series) -> pl.Series:
+    """
+    Convert the measurement string into a float.
+    """
+    feet = series.str.extract(r"(\d+)'").cast(pl.Int64)
+    inches = series.str.extract(r'(\d+)"').cast(pl.Int64).fill_null(0)
+    total_inches = feet * 12 + inches
+    return total_inches
+
+
+def clean_vessel_verbose(vessel_verbose: pl.DataFrame) -> pl.DataFrame:
+    return (
+        vessel_verbose.with_columns(
+            pl.col("Beam", "Length", "Draft")
+            .map_batches(convert_measurement_string_to_inches)
+            .name.suffix("Inches"),
+        )
+        .select(pl.col("*").exclude(["Beam", "Length", "Draft"]))
+        .with_columns(
+            pl.col("YearBuilt").cast(pl.String).str.to_date("%Y"),
+            pl.col("YearRebuilt").cast(pl.Int64).cast(pl.String).str.to_date("%Y"),
+        )
+        .with_columns(
+            pl.col(pl.String).replace(" ", None),
+        )
+        .with_columns(
+            pl.col("VesselName", "VesselAbbrev", "ClassName", "CityBuilt", "PropulsionInfo")
+            .str.to_lowercase()
+            .str.strip_chars()
+        )
+    )
+
+
+def convert_string_to_datetime(series: pl.Series) -> pl.Series:
+    """
+    Convert the datetime format from wadot into a datetime format that polars
+    can understand.
+
+    >>> convert_string_to_datetime(pl.Series(['/Date(1714547700000-0700)/']))
+    shape: (1,)
+    Series: '' [datetime[μs, UTC]]
+    [
+        2024-05-01 07:15:00 UTC
+    ]
+    """
+    unix_timestamp = (
+        (series.str.extract(r"/Date\((\d{13})[-+]").cast(pl.Int64) / 1_000)
+        .cast(pl.Int64)
+        .cast(pl.String)
+    )
+    timezone = series.str.extract(r"([-+]\d{4})")
+    clean_timestamp = unix_timestamp + timezone
+    datetime_series = clean_timestamp.str.to_datetime("%s%z")
+    return datetime_series
+
+
+TERMINAL_NAME_MAPPING = {
+    "anacortes": "anacortes",
+    "bainbridge": "bainbridge island",
+    "bremerton": "bremerton",
+    "clinton": "clinton",
+    "colman": "seattle",
+    "edmonds": "edmonds",
+    "fauntleroy": "fauntleroy",
+    "friday harbor": "friday harbor",
+    "keystone": "coupeville",
+    "kingston": "kingston",
+    "lopez": "lopez island",
+    "mukilteo": "mukilteo",
+    "orcas": "orcas island",
+    "port townsend": "port townsend",
+    "pt. defiance": "point defiance",
+    "shaw": "shaw island",
+    "sidney b. c.": "sidney b.c.",
+    "southworth": "southworth",
+    "tahlequah": "tahlequah",
+    "vashon": "vashon island",
+}
+
+
+def clean_vessel_history(vessel_history: pl.DataFrame) -> pl.DataFrame:
+    terminal_name_mapping_df = pl.DataFrame(
+        {
+            "OldName": TERMINAL_NAME_MAPPING.keys(),
+            "CorrectName": TERMINAL_NAME_MAPPING.values(),
+        }
+    )
+    return (
+        vessel_history.with_columns(
+            pl.col("ScheduledDepart", "ActualDepart", "EstArrival", "Date").map_batches(
+                convert_string_to_datetime
+            ),
+            pl.col("Vessel", "Departing", "Arriving").str.to_lowercase().str.strip_chars(),
+        )
+        # Rows without an arriving terminal are assumed to be cancelled.
+        .filter(
+            pl.col("Arriving").is_not_null(),
+            pl.col("EstArrival").is_not_null(),
+        )
+        .join(
+            terminal_name_mapping_df,
+            left_on="Departing",
+            right_on="OldName",
+            how="left",
+            validate="m:1",
+            coalesce=True,
+        )
+        .rename({"CorrectName": "DepartingCorrected"})
+        .join(
+            terminal_name_mapping_df,
+            left_on="Arriving",
+            right_on="OldName",
+            how="left",
+            validate="m:1",
+            coalesce=True,
+        )
+        .rename({"CorrectName": "ArrivingCorrected"})
+        .drop(["Departing", "Arriving"])
+        .rename({"DepartingCorrected": "Departing", "ArrivingCorrected": "Arriving"})
+        # VesselId doesn't match the vessel verbose data set, so it is dropped.
+        .select(
+            [
+                "Vessel",
+                "Departing",
+                "Arriving",
+                "ScheduledDepart",
+                "ActualDepart",
+                "EstArrival",
+                "Date",
+            ]
+        )
+    )
+
+
+# Validate -------------------------------------------------------------------
+
+
+def validate_vessel_history(
+    vessel_history: pl.DataFrame,
+    vessel_verbose: pl.DataFrame,
+    terminal_locations: pl.DataFrame,
+) -> pl.DataFrame:
+    schema = vessel_history_schema(
+        vessel_names=vessel_verbose.get_column("VesselName").to_list(),
+        terminal_names=terminal_locations.get_column("TerminalName").to_list(),
+    )
+    return schema.validate(vessel_history)
+
+
+def validate_vessel_verbose(vessel_verbose: pl.DataFrame) -> pl.DataFrame:
+    return VesselVerboseSchema.validate(vessel_verbose)
+
+
+def validate_terminal_locations(terminal_locations: pl.DataFrame) -> pl.DataFrame:
+    return TerminalLocationsSchema.validate(terminal_locations)
+
+
+def validate_terminal_weather(terminal_weather: pl.DataFrame) -> pl.DataFrame:
+    return TerminalWeatherSchema.validate(terminal_weather)
+
+
+# Load -----------------------------------------------------------------------
+
+WriteTable = Callable[[str, pl.DataFrame], None]
+
+
+def database_writer(uri: str) -> WriteTable:
+    def write_table(table_name: str, df: pl.DataFrame) -> None:
+        df.write_database(
+            table_name=table_name,
+            connection=uri,
+            engine="adbc",
+            if_table_exists="replace",
+        )
+
+    return write_table
+
+
+def parquet_writer(directory: str) -> WriteTable:
+    """
+    Write each table to `<directory>/<table_name>.parquet` instead of the
+    database, e.g. for a dry run.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+    def write_table(table_name: str, df: pl.DataFrame) -> None:
+        df.write_parquet(Path(directory) / f"{table_name}.parquet")
+
+    return write_table
+
+
+# The delay statistics are stored per day, so that the days a refresh
+# summarises again can replace the stored rows for those days.
+DELAY_SUMMARY_KEYS = ["Departing", "Arriving", "Day", "Weekday", "Hour"]
+
+# Width of the bins of the delay histogram, in minutes.
+DELAY_BIN_MINUTES = 1
+
+# A refresh summarises the trips from this many days before the last day
+# already stored for a route onwards again, to pick up trips that were
+# loaded late.
+REFRESH_OVERLAP_DAYS = 7
+
+
+def with_delay_keys(trips: pl.DataFrame) -> pl.DataFrame:
+    return trips.with_columns(
+        ((pl.col("ActualDepart") - pl.col("ScheduledDepart")).dt.total_seconds() / 60)
+        .alias("DelayMinutes"),
+        pl.col("Date").dt.date().alias("Day"),
+        pl.col("Date").dt.weekday().alias("Weekday"),
+        pl.col("Date").dt.hour().alias("Hour"),
+    )
+
+
+def summarise_delays(trips: pl.DataFrame) -> pl.DataFrame:
+    """
+    Aggregate trips into the route delay statistics: the number of trips and
+    the sum and sum of squares of the delay.
+    """
+    return (
+        with_delay_keys(trips)
+        .group_by(DELAY_SUMMARY_KEYS)
+        .agg(
+            pl.len().cast(pl.Int64).alias("NumTrips"),
+            pl.col("DelayMinutes").sum().alias("SumDelay"),
+            pl.col("DelayMinutes").pow(2).sum().alias("SumSquaredDelay"),
+        )
+    )
+
+
+def summarise_delay_histogram(trips: pl.DataFrame) -> pl.DataFrame:
+    """
+    Aggregate trips into the route delay histogram: the number of trips in
+    each DELAY_BIN_MINUTES wide bin of the delay, starting at `DelayBin`.
+    """
+    return (
+        with_delay_keys(trips)
+        .with_columns(
+            ((pl.col("DelayMinutes") / DELAY_BIN_MINUTES).floor() * DELAY_BIN_MINUTES)
+            .cast(pl.Int64)
+            .alias("DelayBin")
+        )
+        .group_by([*DELAY_SUMMARY_KEYS, "DelayBin"])
+        .agg(pl.len().cast(pl.Int64).alias("NumTrips"))
+    )
+
+
+def refresh_delay_summaries(
+    existing: pl.DataFrame | None,
+    trips: pl.DataFrame,
+    summarise: Callable[[pl.DataFrame], pl.DataFrame],
+    overlap_days: int = REFRESH_OVERLAP_DAYS,
+) -> pl.DataFrame:
+    """
+    Update stored delay summaries with `trips`, the full clean history.
+
+    Each route is summarised again from `overlap_days` before the last day
+    stored for it, and those days replace the stored ones, so trips that
+    share a departure time with the last stored trip, that were loaded late,
+    or that are on a route whose data lags behind the other routes are all
+    counted exactly once. Routes that aren't stored yet are summarised in
+    full.
+    """
+    if existing is None:
+        return summarise(trips)
+
+    route = ["Departing", "Arriving"]
+    refresh_from = existing.group_by(route).agg(
+        (pl.col("Day").max() - pl.duration(days=overlap_days)).alias("RefreshFrom")
+    )
+    kept = (
+        existing.join(refresh_from, on=route)
+        .filter(pl.col("Day") < pl.col("RefreshFrom"))
+        .drop("RefreshFrom")
+    )
+    new_trips = (
+        trips.join(refresh_from, on=route, how="left")
+        .filter(
+            pl.col("RefreshFrom").is_null()
+            | (pl.col("Date").dt.date() >= pl.col("RefreshFrom"))
+        )
+        .drop("RefreshFrom")
+    )
+    return pl.concat(
+        [kept, summarise(new_trips).select(kept.columns)], how="vertical_relaxed"
+    )
+
+
+# Pipeline -------------------------------------------------------------------
+
+
+def build_stages(
+    sources: Sources,
+    username: str,
+    write_table: WriteTable,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> list[Stage]:
+    """
+    The stages of the ETL. The data sets are independent of each other,
+    except that the vessel history is fetched for the vessels in the vessel
+    verbose data set, the weather for the terminals in the terminal
+    locations data set, and the vessel history is validated against both.
+    """
+
+    def load(table_name: str) -> Callable[[pl.DataFrame], pl.DataFrame]:
+        def stage(df: pl.DataFrame) -> pl.DataFrame:
+            write_table(f"{username}_{table_name}", df)
+            return df
+
+        return stage
+
+    def load_delay_summary(
+        table_name: str, summarise: Callable[[pl.DataFrame], pl.DataFrame]
+    ) -> Callable[[pl.DataFrame], pl.DataFrame]:
+        # The whole clean history is in memory here, so the summaries are
+        # computed from scratch rather than refreshed.
+        def stage(vessel_history: pl.DataFrame) -> pl.DataFrame:
+            df = summarise(vessel_history)
+            write_table(f"{username}_{table_name}", df)
+            return df
+
+        return stage
+
+    stages = [
+        Stage("fetch_vessel_verbose", lambda: fetch_vessel_verbose(sources)),
+        Stage(
+            "fetch_vessel_history",
+            lambda vessel_verbose: fetch_vessel_history(
+                sources,
+                vessel_verbose.get_column("VesselName").to_list(),
+                start_date,
+                end_date,
+            ),
+            deps=("fetch_vessel_verbose",),
+        ),
+        Stage("fetch_terminal_locations", lambda: fetch_terminal_locations(sources)),
+        Stage(
+            "fetch_terminal_weather",
+            lambda terminal_locations: fetch_terminal_weather(
+                sources, terminal_locations, start_date, end_date
+            ),
+            deps=("fetch_terminal_locations",),
+        ),
+        Stage("clean_vessel_verbose", clean_vessel_verbose, deps=("fetch_vessel_verbose",)),
+        Stage("clean_vessel_history", clean_vessel_history, deps=("fetch_vessel_history",)),
+        Stage(
+            "clean_terminal_locations",
+            clean_terminal_locations,
+            deps=("fetch_terminal_locations",),
+        ),
+        Stage(
+            "clean_terminal_weather", clean_terminal_weather, deps=("fetch_terminal_weather",)
+        ),
+        Stage(
+            "validate_vessel_verbose", validate_vessel_verbose, deps=("clean_vessel_verbose",)
+        ),
+        Stage(
+            "validate_vessel_history",
+            validate_vessel_history,
+            deps=("clean_vessel_history", "clean_vessel_verbose", "clean_terminal_locations"),
+        ),
+        Stage(
+            "validate_terminal_locations",
+            validate_terminal_locations,
+            deps=("clean_terminal_locations",),
+        ),
+        Stage(
+            "validate_terminal_weather",
+            validate_terminal_weather,
+            deps=("clean_terminal_weather",),
+        ),
+        Stage(
+            "load_route_delay_stats",
+            load_delay_summary("route_delay_stats", summarise_delays),
+            deps=("validate_vessel_history",),
+        ),
+        Stage(
+            "load_route_delay_histogram",
+            load_delay_summary("route_delay_histogram", summarise_delay_histogram),
+            deps=("validate_vessel_history",),
+        ),
+    ]
+    for dataset in DATASETS:
+        stages += [
+            Stage(f"load_{dataset}_raw", load(f"{dataset}_raw"), deps=(f"fetch_{dataset}",)),
+            Stage(
+                f"load_{dataset}_clean", load(f"{dataset}_clean"), deps=(f"validate_{dataset}",)
+            ),
+        ]
+    return stages
@@ -0,0 +1,63 @@
+import datetime
+
+import polars as pl
+
+from etl.stages import refresh_delay_summaries, summarise_delay_histogram, summarise_delays
+
+
+def trips(*rows: tuple[str, str, int]) -> pl.DataFrame:
+    """
+    Trips from (departing, scheduled departure, delay in minutes).
+    """
+    scheduled = [datetime.datetime.fromisoformat(when) for _, when, _ in rows]
+    return pl.DataFrame(
+        {
+            "Departing": [departing for departing, _, _ in rows],
+            "Arriving": "bainbridge",
+            "Date": scheduled,
+            "ScheduledDepart": scheduled,
+            "ActualDepart": [
+                when + datetime.timedelta(minutes=delay)
+                for when, (_, _, delay) in zip(scheduled, rows)
+            ],
+        }
+    ).with_columns(pl.col("Date").dt.replace_time_zone("UTC"))
+
+
+def totals(df: pl.DataFrame) -> dict:
+    return dict(
+        df.group_by("Departing").agg(pl.col("NumTrips").sum()).sort("Departing").iter_rows()
+    )
+
+
+def test_refresh_counts_every_trip_once():
+    loaded = trips(
+        ("seattle", "2024-05-01 08:00", 2),
+        ("seattle", "2024-05-20 08:00", 4),
+        ("edmonds", "2024-05-10 09:00", 1),
+    )
+    stats = refresh_delay_summaries(None, loaded, summarise_delays)
+    histogram = refresh_delay_summaries(None, loaded, summarise_delay_histogram)
+
+    history = pl.concat(
+        [
+            loaded,
+            trips(
+                # the same departure time as the last stored trip
+                ("seattle", "2024-05-20 08:00", 6),
+                # loaded late, before the last stored trip
+                ("seattle", "2024-05-18 10:00", 3),
+                # before the last trip on another route
+                ("edmonds", "2024-05-12 09:00", 5),
+                ("kingston", "2024-05-21 07:00", 0),
+            ),
+        ]
+    )
+    stats = refresh_delay_summaries(stats, history, summarise_delays)
+    histogram = refresh_delay_summaries(histogram, history, summarise_delay_histogram)
+
+    assert totals(stats) == totals(histogram) == {"edmonds": 2, "kingston": 1, "seattle": 4}
+    assert stats.sort(stats.columns).equals(summarise_delays(history).sort(stats.columns))
+    assert histogram.filter(pl.col("Departing") == "seattle").sort("DelayBin")[
+        "DelayBin"
+    ].to_list() == [2, 3, 4, 6]
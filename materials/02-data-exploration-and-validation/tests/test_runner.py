@@ -0,0 +1,64 @@
+import threading
+
+import polars as pl
+import pytest
+
+from etl.runner import Stage, run_stages
+
+
+def test_independent_stages_run_concurrently():
+    # Both fetches wait for each other, so they only finish if they run at
+    # the same time.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch(n: int):
+        def stage() -> pl.DataFrame:
+            barrier.wait()
+            return pl.DataFrame({"x": range(n)})
+
+        return stage
+
+    results = run_stages(
+        [
+            Stage("fetch_a", fetch(3)),
+            Stage("fetch_b", fetch(5)),
+            Stage("join", lambda a, b: pl.concat([a, b]), deps=("fetch_a", "fetch_b")),
+        ]
+    )
+    assert {name: result.rows for name, result in results.items()} == {
+        "fetch_a": 3,
+        "fetch_b": 5,
+        "join": 8,
+    }
+    assert results["join"].started >= results["fetch_b"].started + results["fetch_b"].seconds
+
+
+def test_dependents_of_a_failed_stage_are_skipped():
+    def fail():
+        raise ConnectionError("API down")
+
+    results = run_stages(
+        [
+            Stage("fetch_a", fail),
+            Stage("clean_a", lambda a: a, deps=("fetch_a",)),
+            Stage("load_a", lambda a: a, deps=("clean_a",)),
+            Stage("fetch_b", lambda: [1, 2]),
+        ]
+    )
+    assert {name: result.status for name, result in results.items()} == {
+        "fetch_a": "failed",
+        "clean_a": "skipped",
+        "load_a": "skipped",
+        "fetch_b": "done",
+    }
+    assert isinstance(results["fetch_a"].error, ConnectionError)
+
+
+def test_circular_dependencies_are_rejected():
+    with pytest.raises(ValueError, match="circular"):
+        run_stages(
+            [
+                Stage("a", lambda b: b, deps=("b",)),
+                Stage("b", lambda a: a, deps=("a",)),
+            ]
+        )
@@ -3,8 +3,12 @@ from dotenv import load_dotenv, find_dotenv
 import vetiver
 import pins
 from sklearn.base import BaseEstimator, TransformerMixin
+import os
 import sys
 
+from backends import load_backend
+from prediction_cache import CachedPredictor, watch_model_version
+
 class DenseTransformer(TransformerMixin, BaseEstimator):
     def fit(self, X, y=None, **params):
         return self
@@ -16,8 +20,34 @@ setattr(sys.modules['__main__'], 'DenseTransformer', DenseTransformer)
 
 load_dotenv(find_dotenv())
 
+model_name = 'brooklynbagel/ferry_delay'
+
 b = pins.board_connect(server_url='https://pub.ferryland.posit.team/', allow_pickle_read=True)
-v = VetiverModel.from_pin(b, 'brooklynbagel/ferry_delay')
+v = VetiverModel.from_pin(b, model_name)
+
+# The model can be served by scikit-learn (default) or by onnxruntime using the
+# ONNX graph exported in the training notebook (FERRY_MODEL_BACKEND=onnx).
+backend = load_backend(b, v, os.getenv('FERRY_MODEL_BACKEND', 'sklearn'))
+
+# Serve repeat predictions from memory. The cache is cleared whenever a new
+# version of the model is pinned. PREDICTION_CACHE_SIZE=0 turns it off, for
+# traffic that rarely repeats a request.
+cache_size = int(os.getenv('PREDICTION_CACHE_SIZE', 4096))
+if cache_size > 0:
+    predictor = CachedPredictor(
+        backend.model,
+        version=backend.version,
+        maxsize=cache_size,
+        ttl=float(os.getenv('PREDICTION_CACHE_TTL_SECONDS', 3600)),
+    )
+    v.handler_predict = predictor.handler_predict
+    watch_model_version(
+        b,
+        backend.pin_name,
+        predictor,
+        interval=float(os.getenv('MODEL_VERSION_CHECK_SECONDS', 300)),
+        load_model=backend.load_model,
+    )
 
 vetiver_api = vetiver.VetiverAPI(v)
 api = vetiver_api.app
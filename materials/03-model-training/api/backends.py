@@ -0,0 +1,36 @@
+from typing import Callable, NamedTuple
+
+from vetiver import VetiverModel
+
+from onnx_model import OnnxPredictor
+
+BACKENDS = ("sklearn", "onnx")
+
+
+class Backend(NamedTuple):
+    pin_name: str
+    version: str | None
+    model: object
+    load_model: Callable
+
+
+def load_sklearn_model(board, name: str, version: str | None = None):
+    return VetiverModel.from_pin(board, name, version=version).model
+
+
+def load_backend(board, v: VetiverModel, backend: str = "sklearn") -> Backend:
+    """
+    Load the object that will make predictions for the pinned model `v`.
+
+    - sklearn: the scikit-learn pipeline pinned by vetiver.
+    - onnx: the ONNX graph pinned as `{model_name}_onnx`, run with onnxruntime.
+    """
+    if backend == "onnx":
+        pin_name = f"{v.model_name}_onnx"
+        version = board.pin_meta(pin_name).version.version
+        model = OnnxPredictor.from_pin(board, pin_name, version)
+        return Backend(pin_name, version, model, OnnxPredictor.from_pin)
+    elif backend == "sklearn":
+        return Backend(v.model_name, v.metadata.version, v.model, load_sklearn_model)
+    else:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,119 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _onnx_input_type(dtype):
+    from skl2onnx.common.data_types import FloatTensorType, Int64TensorType, StringTensorType
+
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return Int64TensorType([None, 1])
+    elif pd.api.types.is_float_dtype(dtype):
+        return FloatTensorType([None, 1])
+    else:
+        return StringTensorType([None, 1])
+
+
+def _register_dense_transformer(dense_transformer_class):
+    """
+    The ONNX OneHotEncoder already produces a dense tensor, so the custom
+    DenseTransformer step converts to an Identity node.
+    """
+    from skl2onnx import update_registered_converter
+
+    def shape_calculator(operator):
+        input_type = operator.inputs[0].type
+        operator.outputs[0].type = input_type.__class__(input_type.shape)
+
+    def converter(scope, operator, container):
+        container.add_node(
+            "Identity",
+            operator.inputs[0].full_name,
+            operator.outputs[0].full_name,
+            name=scope.get_unique_operator_name("Identity"),
+        )
+
+    update_registered_converter(
+        dense_transformer_class, "FerryDenseTransformer", shape_calculator, converter
+    )
+
+
+def to_onnx(model, prototype_data: pd.DataFrame) -> bytes:
+    """
+    Convert the fitted ferry delay pipeline into a serialized ONNX graph. Each
+    column of the prototype data becomes one named input of the graph.
+    """
+    from skl2onnx import convert_sklearn
+
+    _register_dense_transformer(type(model.named_steps["densify"]))
+    features = model.named_steps["column-transformer"].feature_names_in_
+    initial_types = [
+        (column, _onnx_input_type(prototype_data[column].dtype)) for column in features
+    ]
+    onnx_model = convert_sklearn(model, initial_types=initial_types)
+    return onnx_model.SerializeToString()
+
+
+class OnnxPredictor:
+    """
+    Serve the ferry delay model with onnxruntime instead of scikit-learn.
+    """
+
+    def __init__(self, onnx_model: bytes | str | Path):
+        import onnxruntime as ort
+
+        if isinstance(onnx_model, Path):
+            onnx_model = str(onnx_model)
+        self.session = ort.InferenceSession(
+            onnx_model, providers=["CPUExecutionProvider"]
+        )
+        self.inputs = {i.name: i.type for i in self.session.get_inputs()}
+
+    def _feed(self, input_data: pd.DataFrame) -> dict[str, np.ndarray]:
+        feed = {}
+        for name, onnx_type in self.inputs.items():
+            column = input_data[name]
+            if onnx_type == "tensor(string)":
+                values = column.astype(str).to_numpy(dtype=object)
+            elif onnx_type == "tensor(int64)":
+                values = column.to_numpy(dtype=np.int64)
+            else:
+                values = column.to_numpy(dtype=np.float32, na_value=np.nan)
+            feed[name] = values.reshape(-1, 1)
+        return feed
+
+    def predict(self, input_data: pd.DataFrame) -> np.ndarray:
+        (predictions,) = self.session.run(None, self._feed(input_data))
+        return predictions.ravel().astype(float)
+
+    @classmethod
+    def from_pin(cls, board, name: str, version: str | None = None) -> "OnnxPredictor":
+        (path,) = board.pin_download(name, version=version)
+        return cls(path)
+
+
+def pin_onnx_model(board, v, test_data: pd.DataFrame, atol: float = 1e-3) -> OnnxPredictor:
+    """
+    Export the model wrapped by `v` to ONNX, check that it agrees with the
+    scikit-learn predictions on `test_data`, and pin it next to the vetiver
+    model as `{model_name}_onnx`.
+    """
+    onnx_model = to_onnx(v.model, test_data)
+    onnx_predictor = OnnxPredictor(onnx_model)
+    np.testing.assert_allclose(
+        onnx_predictor.predict(test_data), v.model.predict(test_data), atol=atol
+    )
+
+    model_version = board.pin_meta(v.model_name).version.version
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "ferry_delay.onnx"
+        path.write_bytes(onnx_model)
+        board.pin_upload(
+            str(path),
+            f"{v.model_name}_onnx",
+            title=f"{v.model_name} (ONNX)",
+            metadata={"model_version": model_version},
+        )
+    return onnx_predictor
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def row_keys(input_data: pd.DataFrame) -> list[int]:
+    """
+    Hash every validated feature row once, so that equivalent rows share a
+    cache entry regardless of the order of the columns.
+
+    >>> a = pd.DataFrame({"Hour": [12, 13], "Vessel": ["cathlamet", "chelan"]})
+    >>> b = pd.DataFrame({"Vessel": ["cathlamet", "tokitae"], "Hour": [12, 13]})
+    >>> [key_a == key_b for key_a, key_b in zip(row_keys(a), row_keys(b))]
+    [True, False]
+    """
+    columns = []
+    for name in sorted(input_data.columns):
+        values = input_data[name].tolist()
+        if pd.api.types.is_float_dtype(input_data[name].dtype):
+            # NaN isn't equal to itself, so missing values would never match.
+            values = [None if value != value else value for value in values]
+        columns.append(values)
+    return [hash(row) for row in zip(*columns)]
+
+
+class CachedPredictor:
+    """
+    LRU cache with a time to live that sits in front of the model's `predict`.
+
+    Entries are keyed on the hash of each validated row (see `row_keys`) and
+    are tied to the pinned model version. Setting a new model clears the
+    cache.
+    """
+
+    def __init__(self, model, version: str | None, maxsize: int = 4096, ttl: float = 3600):
+        self.model = model
+        self.version = version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_model(self, model, version: str | None):
+        with self._lock:
+            self.model = model
+            self.version = version
+            self._entries.clear()
+        logger.info(f"Prediction cache cleared for model version {version}")
+
+    def predict(self, input_data: pd.DataFrame) -> np.ndarray:
+        keys = row_keys(input_data)
+        predictions = np.empty(len(keys), dtype=float)
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            model = self.model
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    predictions[i] = entry[1]
+                else:
+                    missing.append(i)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # Score all of the cache misses in a single call to the model.
+            missing_data = input_data if len(missing) == len(keys) else input_data.iloc[missing]
+            missing_predictions = model.predict(missing_data)
+            predictions[missing] = missing_predictions
+            with self._lock:
+                if model is self.model:
+                    for i, prediction in zip(missing, missing_predictions):
+                        self._entries[keys[i]] = (now + self.ttl, float(prediction))
+                        self._entries.move_to_end(keys[i])
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+
+        return predictions
+
+    def handler_predict(self, input_data, check_prototype) -> list:
+        """
+        Drop in replacement for `VetiverModel.handler_predict`.
+        """
+        if not isinstance(input_data, pd.DataFrame):
+            input_data = pd.DataFrame([input_data])
+        return self.predict(input_data).tolist()
+
+
+def watch_model_version(
+    board,
+    name: str,
+    predictor: CachedPredictor,
+    interval: float,
+    load_model: Callable,
+):
+    """
+    Poll the pin in a background thread. When a new version of the model is
+    pinned, load it with `load_model` and invalidate the cached predictions.
+    """
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                version = board.pin_meta(name).version.version
+                if version != predictor.version:
+                    logger.info(f"New version of {name} found: {version}")
+                    predictor.set_model(load_model(board, name, version), version)
+            except Exception as e:
+                logger.warning(f"Could not check the version of {name}: {e}")
+
+    thread = threading.Thread(target=watch, name="model-version-watcher", daemon=True)
+    thread.start()
+    return thread
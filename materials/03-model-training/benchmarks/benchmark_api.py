@@ -0,0 +1,260 @@
+"""
+Latency and throughput benchmark for the ferry delay model API.
+
+The vetiver FastAPI app is started in-process against a model pinned to a
+temporary pins board folder, so neither Posit Connect nor the database are
+needed. Requests are sent through `httpx.ASGITransport`, so the numbers
+measure request validation, the prediction backend and response
+serialization, but not the network.
+
+    python benchmarks/benchmark_api.py --backend sklearn --backend onnx
+    python benchmarks/benchmark_api.py --batch-size 1 --batch-size 500 --concurrency 16 --cache
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pins
+import polars as pl
+import vetiver
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.append(str(Path(__file__).parents[1] / "api"))
+
+from backends import BACKENDS, load_backend  # noqa: E402
+from onnx_model import pin_onnx_model  # noqa: E402
+from prediction_cache import CachedPredictor  # noqa: E402
+
+import httpx  # noqa: E402
+
+numeric_features = [
+    "SpeedInKnots",
+    "EngineCount",
+    "Horsepower",
+    "MaxPassengerCount",
+    "YearBuilt",
+    "YearRebuilt",
+    "departing_temperature_2m",
+    "departing_cloud_cover",
+    "departing_wind_speed_10m",
+    "departing_wind_direction_10m",
+    "departing_wind_gusts_10m",
+    "arriving_temperature_2m",
+    "arriving_cloud_cover",
+    "arriving_wind_speed_10m",
+    "arriving_wind_direction_10m",
+    "arriving_wind_gusts_10m",
+]
+
+categorical_features = [
+    "Vessel",
+    "Weekday",
+    "Hour",
+    "Departing",
+    "Arriving",
+    "ClassName",
+    "PropulsionInfo",
+    "departing_weather_code",
+    "arriving_weather_code",
+]
+
+
+class DenseTransformer(TransformerMixin, BaseEstimator):
+    def fit(self, X, y=None, **params):
+        return self
+
+    def transform(self, X, y=None, **params):
+        return X.toarray()
+
+
+def synthetic_training_data(n_rows: int, seed: int = 2) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Random trips with the same columns and types as the `prototype_data` used
+    when the model is trained in notebook.ipynb.
+    """
+    rng = np.random.default_rng(seed)
+    vessels = ["cathlamet", "chelan", "issaquah", "kaleetan", "spokane", "tokitae"]
+    terminals = ["seattle", "bainbridge island", "edmonds", "kingston", "fauntleroy"]
+    weather_codes = ["0", "1", "2", "3", "51", "53", "61", "other"]
+
+    data = {
+        "Vessel": rng.choice(vessels, n_rows),
+        "Departing": rng.choice(terminals, n_rows),
+        "Arriving": rng.choice(terminals, n_rows),
+        "Weekday": rng.integers(1, 8, n_rows).astype("int8"),
+        "Hour": rng.integers(0, 24, n_rows).astype("int8"),
+        "ClassName": rng.choice(["issaquah 130", "jumbo mark ii", "olympic"], n_rows),
+        "SpeedInKnots": rng.integers(13, 19, n_rows),
+        "EngineCount": rng.integers(2, 5, n_rows),
+        "Horsepower": rng.integers(2_500, 16_000, n_rows),
+        "MaxPassengerCount": rng.integers(1_000, 2_500, n_rows),
+        "PassengerOnly": rng.random(n_rows) < 0.1,
+        "FastFerry": rng.random(n_rows) < 0.1,
+        "PropulsionInfo": rng.choice(["diesel", "diesel-electric (ac)"], n_rows),
+        "YearBuilt": rng.integers(1959, 2018, n_rows).astype("int32"),
+        "YearRebuilt": np.where(
+            rng.random(n_rows) < 0.4, np.nan, rng.integers(1990, 2020, n_rows)
+        ),
+    }
+    for terminal in ["departing", "arriving"]:
+        data[f"{terminal}_weather_code"] = rng.choice(weather_codes, n_rows)
+        data[f"{terminal}_temperature_2m"] = rng.normal(12, 6, n_rows)
+        data[f"{terminal}_precipitation"] = rng.exponential(0.3, n_rows)
+        data[f"{terminal}_cloud_cover"] = rng.integers(0, 101, n_rows)
+        data[f"{terminal}_wind_speed_10m"] = rng.gamma(2, 6, n_rows)
+        data[f"{terminal}_wind_direction_10m"] = rng.integers(0, 361, n_rows)
+        data[f"{terminal}_wind_gusts_10m"] = rng.gamma(2, 12, n_rows)
+    X = pd.DataFrame(data)
+
+    delay = rng.gamma(1.5, 120, n_rows) + X["Hour"] * 15 + X["departing_wind_gusts_10m"] * 4
+    y = np.log(np.maximum(delay, 1))
+    return X, y
+
+
+def train_model(X: pd.DataFrame, y: np.ndarray) -> Pipeline:
+    """
+    Same pipeline as notebook.ipynb. `sparse_threshold=1.0` keeps the output of
+    the column transformer sparse, like it is for the real (much larger) data.
+    """
+    column_transformer = ColumnTransformer(
+        [
+            ("numeric_features", "passthrough", numeric_features),
+            ("categorical_features", OneHotEncoder(), categorical_features),
+        ],
+        sparse_threshold=1.0,
+    )
+    model = Pipeline(
+        [
+            ("column-transformer", column_transformer),
+            ("densify", DenseTransformer()),
+            ("regressor", HistGradientBoostingRegressor(random_state=2)),
+        ]
+    )
+    return model.fit(X, y)
+
+
+def payloads(X: pd.DataFrame, n_requests: int, batch_size: int, seed: int = 3) -> list[list[dict]]:
+    """
+    JSON request bodies built from random rows of the prototype data. Missing
+    `YearRebuilt` values are imputed with the current year like the Shiny app.
+    """
+    records = (
+        X.assign(YearRebuilt=X["YearRebuilt"].fillna(datetime.date.today().year))
+        .astype({"YearRebuilt": int})
+        .to_dict(orient="records")
+    )
+    rng = random.Random(seed)
+    return [
+        [{k: v.item() if hasattr(v, "item") else v for k, v in rng.choice(records).items()}
+         for _ in range(batch_size)]
+        for _ in range(n_requests)
+    ]
+
+
+async def run_load(app, bodies: list[list[dict]], concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+
+        async def send(body):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/predict", json=body)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[send(body) for body in bodies])
+        elapsed = time.perf_counter() - start
+
+    return latencies, elapsed
+
+
+def benchmark(board, backend: str, cache: bool, X: pd.DataFrame, args) -> list[dict]:
+    v = vetiver.VetiverModel.from_pin(board, "ferry_delay")
+    loaded = load_backend(board, v, backend)
+    if cache:
+        predictor = CachedPredictor(loaded.model, version=loaded.version)
+        v.handler_predict = predictor.handler_predict
+    else:
+        v.handler_predict = lambda input_data, check_prototype: loaded.model.predict(
+            input_data
+        ).tolist()
+    app = vetiver.VetiverAPI(v).app
+
+    results = []
+    for batch_size in args.batch_size:
+        # Warm up the backend before measuring.
+        asyncio.run(run_load(app, payloads(X, 5, batch_size, seed=0), 1))
+        bodies = payloads(X, args.requests, batch_size)
+        latencies, elapsed = asyncio.run(run_load(app, bodies, args.concurrency))
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1_000, [50, 95, 99])
+        results.append(
+            {
+                "backend": backend + (" + cache" if cache else ""),
+                "batch_size": batch_size,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "rows_per_second": args.requests * batch_size / elapsed,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", action="append", choices=BACKENDS)
+    parser.add_argument("--batch-size", action="append", type=int)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--training-rows", type=int, default=20_000)
+    parser.add_argument(
+        "--cache", action="store_true", help="Also benchmark each backend behind the prediction cache."
+    )
+    args = parser.parse_args()
+    args.backend = args.backend or ["sklearn"]
+    args.batch_size = args.batch_size or [1, 100]
+
+    # The pinned model pickle references DenseTransformer from __main__, the
+    # same as the model trained in the notebook.
+    setattr(sys.modules["__main__"], "DenseTransformer", DenseTransformer)
+
+    X, y = synthetic_training_data(args.training_rows)
+    model = train_model(X, y)
+
+    results = []
+    with tempfile.TemporaryDirectory() as board_path:
+        board = pins.board_folder(board_path, allow_pickle_read=True)
+        v = vetiver.VetiverModel(model, "ferry_delay", prototype_data=X)
+        vetiver.vetiver_pin_write(board, v)
+        if "onnx" in args.backend:
+            pin_onnx_model(board, v, X.head(1_000))
+
+        for backend in args.backend:
+            for cache in [False, True] if args.cache else [False]:
+                results += benchmark(board, backend, cache, X, args)
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, float_precision=2, thousands_separator=True):
+        print(pl.DataFrame(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Reference histograms of the training data, pinned with the model so the
+monitoring dashboard can check new trips for feature drift against them (see
+../04-model-monitoring/drift.py).
+
+Every numeric feature is binned by its deciles and every categorical feature
+gets one bin per category. The bins are laid out the way `drift.py` reads
+them: the numeric bins from lowest to highest, or the categories followed by
+a bin for categories that weren't in the training data, and then a bin for
+the nulls.
+"""
+
+import polars as pl
+
+
+def bin_shares(feature: str, bins: dict) -> list[pl.Expr]:
+    """
+    The share of rows in each of `feature`'s bins, in the order of
+    `bins["expected"]`. The last bin holds the nulls.
+    """
+    column = pl.col(feature)
+    if bins["type"] == "numeric":
+        bounds = [float("-inf"), *bins["edges"], float("inf")]
+        in_bins = [
+            column.is_between(lower, upper, closed="right")
+            for lower, upper in zip(bounds, bounds[1:])
+        ]
+    else:
+        categories = bins["categories"]
+        in_bins = [column == category for category in categories]
+        # categories that weren't in the training data
+        in_bins.append(column.is_not_null() & ~column.is_in(categories))
+    in_bins.append(column.is_null())
+    return [in_bin.sum() / pl.len() for in_bin in in_bins]
+
+
+def reference_histograms(
+    data: pl.DataFrame,
+    numeric_features: list[str],
+    categorical_features: list[str],
+    num_bins: int = 10,
+) -> dict:
+    """
+    Bin every feature of the training data, as a JSON serializable dict to
+    pin with the model (`VetiverModel(..., metadata={"drift_reference": ...})`).
+    """
+    quantiles = data.select(
+        [
+            pl.col(feature).quantile(i / num_bins).alias(f"{feature}:{i}")
+            for feature in numeric_features
+            for i in range(1, num_bins)
+        ]
+    ).row(0, named=True)
+
+    reference: dict[str, dict] = {}
+    for feature in numeric_features:
+        edges = {quantiles[f"{feature}:{i}"] for i in range(1, num_bins)}
+        reference[feature] = {
+            "type": "numeric",
+            "edges": sorted(float(edge) for edge in edges if edge is not None),
+        }
+    for feature in categorical_features:
+        reference[feature] = {
+            "type": "categorical",
+            "categories": data[feature].drop_nulls().unique().sort().to_list(),
+        }
+
+    expected = data.select(
+        [
+            share.alias(f"{feature}:{i}")
+            for feature, bins in reference.items()
+            for i, share in enumerate(bin_shares(feature, bins))
+        ]
+    ).row(0)
+    offset = 0
+    for bins in reference.values():
+        num_shares = len(bins.get("edges", bins.get("categories"))) + 2
+        bins["expected"] = [float(share) for share in expected[offset : offset + num_shares]]
+        offset += num_shares
+    return reference
@@ -0,0 +1,74 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+from drift_reference import bin_shares, reference_histograms  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def data() -> pl.DataFrame:
+    rng = np.random.default_rng(2)
+    n_rows = 5_000
+    return pl.DataFrame(
+        {
+            "departing_temperature_2m": rng.normal(12, 6, n_rows),
+            "YearRebuilt": np.where(
+                rng.random(n_rows) < 0.4, np.nan, rng.integers(1990, 2020, n_rows)
+            ),
+            "Vessel": rng.choice(["chelan", "tokitae", "walla walla"], n_rows),
+            "Hour": rng.integers(0, 24, n_rows).astype("int8"),
+        }
+    ).with_columns(pl.col("YearRebuilt").fill_nan(None))
+
+
+@pytest.fixture(scope="module")
+def reference(data) -> dict:
+    return reference_histograms(
+        data, ["departing_temperature_2m", "YearRebuilt"], ["Vessel", "Hour"]
+    )
+
+
+def test_numeric_features_are_binned_by_deciles(reference):
+    temperature = reference["departing_temperature_2m"]
+    assert temperature["type"] == "numeric"
+    assert len(temperature["edges"]) == 9
+    # deciles, plus an empty bin for the nulls
+    assert temperature["expected"][:-1] == pytest.approx([0.1] * 10, abs=1e-3)
+    assert temperature["expected"][-1] == 0
+
+    year_rebuilt = reference["YearRebuilt"]
+    assert year_rebuilt["expected"][-1] == pytest.approx(0.4, abs=0.02)
+    assert sum(year_rebuilt["expected"]) == pytest.approx(1)
+
+
+def test_categorical_features_have_a_bin_per_category(reference):
+    vessel = reference["Vessel"]
+    assert vessel["type"] == "categorical"
+    assert vessel["categories"] == ["chelan", "tokitae", "walla walla"]
+    # one bin per category, then unseen categories and nulls
+    assert len(vessel["expected"]) == 5
+    assert vessel["expected"][-2:] == [0, 0]
+    assert sum(vessel["expected"]) == pytest.approx(1)
+
+    assert reference["Hour"]["categories"] == list(range(24))
+
+
+def test_reference_is_json_serializable(reference):
+    assert json.loads(json.dumps(reference)) == reference
+
+
+def test_bin_shares_count_unseen_categories_and_nulls(reference):
+    data = pl.DataFrame({"Vessel": ["chelan", "chelan", "kaleetan", None]})
+    shares = data.select(
+        [
+            share.alias(str(i))
+            for i, share in enumerate(bin_shares("Vessel", reference["Vessel"]))
+        ]
+    ).row(0)
+    assert shares == (0.5, 0, 0, 0.25, 0.25)
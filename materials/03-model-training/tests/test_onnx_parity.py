@@ -0,0 +1,66 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, TransformerMixin
+
+sys.path.append(str(Path(__file__).parents[1] / "api"))
+sys.path.append(str(Path(__file__).parents[1] / "benchmarks"))
+
+from benchmark_api import synthetic_training_data, train_model  # noqa: E402
+from onnx_model import OnnxPredictor, to_onnx  # noqa: E402
+
+
+class DenseTransformer(TransformerMixin, BaseEstimator):
+    def fit(self, X, y=None, **params):
+        return self
+
+    def transform(self, X, y=None, **params):
+        return X.toarray()
+
+
+setattr(sys.modules["__main__"], "DenseTransformer", DenseTransformer)
+
+
+def test_onnx_predictions_match_sklearn_offline():
+    X, y = synthetic_training_data(2_000)
+    model = train_model(X, y)
+    onnx_predictor = OnnxPredictor(to_onnx(model, X))
+
+    test_data, _ = synthetic_training_data(500, seed=3)
+    np.testing.assert_allclose(
+        onnx_predictor.predict(test_data), model.predict(test_data), atol=1e-3
+    )
+
+
+@pytest.fixture(scope="module")
+def username() -> str:
+    if not os.getenv("CONNECT_API_KEY") or not os.getenv("DATABASE_URI_PYTHON"):
+        pytest.skip("CONNECT_API_KEY and DATABASE_URI_PYTHON are required")
+
+    from posit.connect import Client
+
+    with Client() as client:
+        return client.me.username
+
+
+def test_onnx_predictions_match_sklearn_on_test_data(username):
+    import pins
+    import polars as pl
+    from vetiver import VetiverModel
+
+    board = pins.board_connect(allow_pickle_read=True)
+    v = VetiverModel.from_pin(board, f"{username}/ferry_delay")
+    onnx_predictor = OnnxPredictor.from_pin(board, f"{username}/ferry_delay_onnx")
+
+    test_data = pl.read_database_uri(
+        query=f"SELECT * FROM {username}_test_data;",
+        uri=os.environ["DATABASE_URI_PYTHON"],
+        engine="adbc",
+    ).drop("LogDelay").to_pandas()
+
+    np.testing.assert_allclose(
+        onnx_predictor.predict(test_data), v.model.predict(test_data), atol=1e-3
+    )
@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1] / "api"))
+
+import prediction_cache  # noqa: E402
+from prediction_cache import CachedPredictor, watch_model_version  # noqa: E402
+
+
+class HourModel:
+    """
+    Predicts the hour plus an offset, and records the rows it was asked for.
+    """
+
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.calls: list[list[int]] = []
+
+    def predict(self, input_data: pd.DataFrame) -> np.ndarray:
+        self.calls.append(input_data["Hour"].tolist())
+        return input_data["Hour"].to_numpy(dtype=float) + self.offset
+
+
+def trips(*hours: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"Vessel": "tokitae", "Hour": list(hours), "YearRebuilt": np.nan}
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000.0)
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: clock.now)
+    return clock
+
+
+def test_hits_and_misses(clock):
+    model = HourModel()
+    predictor = CachedPredictor(model, version="1")
+
+    np.testing.assert_array_equal(predictor.predict(trips(8, 9)), [8, 9])
+    # only the new row is sent to the model, in one call
+    np.testing.assert_array_equal(predictor.predict(trips(9, 10, 8)), [9, 10, 8])
+    assert model.calls == [[8, 9], [10]]
+    assert (predictor.hits, predictor.misses) == (2, 3)
+
+    # the same row with its columns in another order, and a missing value
+    reordered = trips(10)[["YearRebuilt", "Hour", "Vessel"]]
+    assert predictor.predict(reordered).tolist() == [10]
+    assert predictor.hits == 3
+
+
+def test_entries_expire_after_the_ttl(clock):
+    model = HourModel()
+    predictor = CachedPredictor(model, version="1", ttl=60)
+
+    predictor.predict(trips(8))
+    clock.now += 59
+    predictor.predict(trips(8))
+    clock.now += 2
+    predictor.predict(trips(8))
+    assert model.calls == [[8], [8]]
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    model = HourModel()
+    predictor = CachedPredictor(model, version="1", maxsize=2)
+
+    predictor.predict(trips(8, 9))
+    predictor.predict(trips(8))  # 9 is now the least recently used
+    predictor.predict(trips(10))
+    predictor.predict(trips(8, 9))
+    assert model.calls == [[8, 9], [10], [9]]
+
+
+def test_a_new_model_version_clears_the_cache(clock):
+    predictor = CachedPredictor(HourModel(), version="1")
+    predictor.predict(trips(8))
+
+    new_model = HourModel(offset=0.5)
+    predictor.set_model(new_model, "2")
+    assert predictor.predict(trips(8)).tolist() == [8.5]
+    assert new_model.calls == [[8]]
+
+
+def test_predictions_from_a_replaced_model_are_not_stored(clock):
+    new_model = HourModel(offset=0.5)
+
+    class ReplacedWhilePredicting(HourModel):
+        def predict(self, input_data):
+            # a new version is pinned while this prediction is running
+            predictor.set_model(new_model, "2")
+            return super().predict(input_data)
+
+    predictor = CachedPredictor(ReplacedWhilePredicting(), version="1")
+    assert predictor.predict(trips(8)).tolist() == [8]
+    assert predictor.predict(trips(8)).tolist() == [8.5]
+    assert new_model.calls == [[8]]
+
+
+def test_watch_model_version_loads_new_versions():
+    pinned = SimpleNamespace(version="1")
+    board = SimpleNamespace(
+        pin_meta=lambda name: SimpleNamespace(version=SimpleNamespace(version=pinned.version))
+    )
+    loaded = threading.Event()
+
+    def load_model(board, name, version):
+        loaded.set()
+        return HourModel(offset=float(version))
+
+    predictor = CachedPredictor(HourModel(), version="1")
+    predictor.predict(trips(8))
+    watch_model_version(board, "ferry_delay", predictor, interval=0.01, load_model=load_model)
+
+    time.sleep(0.05)
+    assert not loaded.is_set()
+
+    pinned.version = "2"
+    assert loaded.wait(timeout=5)
+    deadline = time.monotonic() + 5
+    while predictor.version != "2" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predictor.predict(trips(8)).tolist() == [10]
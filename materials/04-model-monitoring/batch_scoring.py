@@ -0,0 +1,193 @@
+"""
+Score the monitoring data in chunks, in parallel, and only once.
+
+The monitoring dashboard used to read the whole `{username}_monitoring_data`
+table and call `model.predict` on it in one go, so memory peaked at the size
+of the table plus the model's one-hot encoded copy of it. Here the trips that
+have no prediction yet are streamed from the database as Arrow record
+batches, scored across a process pool, and appended to
+`{username}_monitoring_predictions`. Rendering the dashboard again only
+scores trips added since the last render (or all of them after a new model
+version is pinned).
+"""
+
+import datetime
+import multiprocessing
+import os
+import pickle
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Iterable, Iterator
+
+import cloudpickle
+import polars as pl
+import pyarrow as pa
+
+# Every feature the model uses is determined by these columns (the weather
+# is hourly, and the vessel details come from the vessel), so trips that
+# share them get the same prediction and are scored once.
+TRIP_KEY = ["Vessel", "Departing", "Arriving", "Date", "Hour"]
+
+BATCH_ROWS = int(os.getenv("BATCH_SCORING_ROWS", 50_000))
+
+_model: Any = None
+
+
+def connect(db_uri: str):
+    import adbc_driver_postgresql.dbapi
+
+    return adbc_driver_postgresql.dbapi.connect(db_uri)
+
+
+def table_exists(conn, table_name: str) -> bool:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_name = $1",
+            parameters=(table_name,),
+        )
+        return cursor.fetchone() is not None
+
+
+def _quoted(columns: list[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def read_unscored_trips(
+    conn, username: str, model_version: str, batch_rows: int = BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream one row per trip that has no prediction from `model_version` yet,
+    in record batches of at most `batch_rows` rows.
+    """
+    query = (
+        f"SELECT DISTINCT ON ({_quoted(TRIP_KEY)}) * "
+        f"FROM {username}_monitoring_data AS m"
+    )
+    parameters = None
+    if table_exists(conn, f"{username}_monitoring_predictions"):
+        on_trip = " AND ".join(f'p."{column}" = m."{column}"' for column in TRIP_KEY)
+        query += (
+            f" WHERE NOT EXISTS (SELECT 1 FROM {username}_monitoring_predictions AS p"
+            f' WHERE {on_trip} AND p."ModelVersion" = $1)'
+        )
+        parameters = (model_version,)
+
+    with conn.cursor() as cursor:
+        cursor.execute(query, parameters=parameters)
+        for batch in cursor.fetch_record_batch():
+            for offset in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(offset, batch_rows)
+
+
+def _init_worker(pickled_model: bytes) -> None:
+    global _model
+    _model = pickle.loads(pickled_model)
+
+
+def _score_batch(batch: pa.RecordBatch) -> pa.Table:
+    trips = pl.from_arrow(batch)
+    return trips.select(
+        *TRIP_KEY,
+        pl.Series("preds", _model.predict(trips.drop("LogDelay")), dtype=pl.Float64),
+    ).to_arrow()
+
+
+def score_batches(
+    batches: Iterable[pa.RecordBatch], model: Any, max_workers: int | None = None
+) -> Iterator[pa.Table]:
+    """
+    Score record batches across a process pool, yielding the trip key and
+    prediction of each batch in order.
+
+    At most two batches per worker are in flight at once, so memory stays
+    bounded however many batches there are.
+
+    The workers are spawned rather than forked, because forking a process
+    that has already started polars' thread pool can deadlock the children.
+    The model is sent to them with cloudpickle, which also carries classes
+    defined in the notebook or dashboard itself (like DenseTransformer).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(cloudpickle.dumps(model),),
+    ) as pool:
+        in_flight: deque[Future] = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(_score_batch, batch))
+            if len(in_flight) >= 2 * max_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def write_predictions(
+    conn, username: str, model_version: str, predictions: pa.Table
+) -> None:
+    """
+    Append predictions, stamped with the model version and when they were
+    scored (which metrics_store.py uses to find the weeks to update).
+    """
+    scored_at = datetime.datetime.now(datetime.timezone.utc)
+    predictions = predictions.append_column(
+        "ModelVersion", pa.array([model_version] * predictions.num_rows, pa.string())
+    ).append_column(
+        "ScoredAt",
+        pa.array([scored_at] * predictions.num_rows, pa.timestamp("us", tz="UTC")),
+    )
+    table_name = f"{username}_monitoring_predictions"
+    mode = "append" if table_exists(conn, table_name) else "create"
+    with conn.cursor() as cursor:
+        cursor.adbc_ingest(table_name, predictions, mode=mode)
+    conn.commit()
+
+
+def score_new_trips(
+    model: Any,
+    username: str,
+    model_version: str,
+    db_uri: str,
+    batch_rows: int = BATCH_ROWS,
+    max_workers: int | None = None,
+) -> int:
+    """
+    Score the monitoring trips that `model_version` hasn't scored yet and
+    store the predictions. Returns the number of trips scored.
+    """
+    num_scored = 0
+    with connect(db_uri) as read_conn, connect(db_uri) as write_conn:
+        batches = read_unscored_trips(read_conn, username, model_version, batch_rows)
+        for predictions in score_batches(batches, model, max_workers):
+            write_predictions(write_conn, username, model_version, predictions)
+            num_scored += predictions.num_rows
+    return num_scored
+
+
+def read_scored_trips(
+    username: str, model_version: str, db_uri: str, weeks: int | None = None
+) -> pl.DataFrame:
+    """
+    The monitoring data with the prediction from `model_version` for each
+    trip in a `preds` column. With `weeks`, only the trips of the last
+    `weeks` weeks of the monitoring data are read.
+    """
+    query = f"""
+        SELECT m.*, p.preds
+        FROM {username}_monitoring_data AS m
+        JOIN {username}_monitoring_predictions AS p USING ({_quoted(TRIP_KEY)})
+        WHERE p."ModelVersion" = $1
+    """
+    parameters: tuple = (model_version,)
+    if weeks is not None:
+        query += f"""
+        AND m."Date" > (SELECT max("Date") FROM {username}_monitoring_data)
+            - 7 * CAST($2 AS INTEGER)
+        """
+        parameters += (weeks,)
+
+    with connect(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute(query, parameters=parameters)
+        return pl.from_arrow(cursor.fetch_arrow_table())
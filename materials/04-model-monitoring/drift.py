@@ -0,0 +1,92 @@
+"""
+Feature drift between the training data and the monitoring data.
+
+When the model is trained, every feature of the training data is binned
+(deciles for numeric features, one bin per category for categorical ones)
+and the bins are pinned with the model as vetiver metadata, see
+`reference_histograms` in ../03-model-training/drift_reference.py.
+`drift_by_window` then compares the monitoring data with those bins: the share of trips in every bin of every
+feature, and from those the PSI and KS statistics, are computed in a single
+polars aggregation per window rather than a Python loop over features.
+"""
+
+import polars as pl
+
+# Bins with no trips get this share instead, so the PSI stays finite.
+MIN_SHARE = 1e-4
+
+# Conventional PSI thresholds: below 0.1 there is no meaningful drift, above
+# 0.25 the feature has shifted enough to look into.
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+
+def _bin_shares(feature: str, bins: dict) -> list[pl.Expr]:
+    """
+    The share of rows in each of `feature`'s bins, in the order of
+    `bins["expected"]`. The last bin holds the nulls. This bins the data
+    exactly like `bin_shares` in drift_reference.py bins the training data;
+    tests/test_drift.py checks the two against each other.
+    """
+    column = pl.col(feature)
+    if bins["type"] == "numeric":
+        bounds = [float("-inf"), *bins["edges"], float("inf")]
+        in_bins = [
+            column.is_between(lower, upper, closed="right")
+            for lower, upper in zip(bounds, bounds[1:])
+        ]
+    else:
+        categories = bins["categories"]
+        in_bins = [column == category for category in categories]
+        # categories that weren't in the training data
+        in_bins.append(column.is_not_null() & ~column.is_in(categories))
+    in_bins.append(column.is_null())
+    return [in_bin.sum() / pl.len() for in_bin in in_bins]
+
+
+def _psi(actual: list[pl.Expr], expected: list[float]) -> pl.Expr:
+    """
+    Population stability index: sum((actual - expected) * ln(actual / expected)).
+    """
+    return pl.sum_horizontal(
+        (share.clip(lower_bound=MIN_SHARE) - max(reference, MIN_SHARE))
+        * (share.clip(lower_bound=MIN_SHARE) / max(reference, MIN_SHARE)).log()
+        for share, reference in zip(actual, expected)
+    )
+
+
+def _ks(actual: list[pl.Expr], expected: list[float]) -> pl.Expr:
+    """
+    Kolmogorov-Smirnov statistic on the binned values: the largest difference
+    between the cumulative shares.
+    """
+    differences = []
+    cumulative_actual: pl.Expr = pl.lit(0.0)
+    cumulative_expected = 0.0
+    for share, reference in zip(actual, expected):
+        cumulative_actual = cumulative_actual + share
+        cumulative_expected += reference
+        differences.append((cumulative_actual - cumulative_expected).abs())
+    return pl.max_horizontal(differences)
+
+
+def drift_by_window(
+    data: pl.DataFrame, reference: dict, date_var: str = "Date", period: str = "1w"
+) -> pl.DataFrame:
+    """
+    PSI of every feature in `reference` (columns "<feature>_psi"), and KS of
+    the numeric ones ("<feature>_ks"), for each `period` of `data`. Windows
+    start on the same Mondays as the metrics in metrics_store.py.
+    """
+    statistics = [pl.len().alias("n")]
+    for feature, bins in reference.items():
+        shares = _bin_shares(feature, bins)
+        statistics.append(_psi(shares, bins["expected"]).alias(f"{feature}_psi"))
+        if bins["type"] == "numeric":
+            statistics.append(_ks(shares, bins["expected"]).alias(f"{feature}_ks"))
+
+    return (
+        data.group_by(pl.col(date_var).dt.truncate(period).alias("window"))
+        .agg(statistics)
+        .sort("window")
+    )
@@ -0,0 +1,155 @@
+"""
+Weekly model metrics, kept up to date incrementally in the database.
+
+`{username}_monitoring_metrics` holds one row of aggregates per model version
+and week: the number of trips, the confusion matrix cells for "late"
+(LogDelay above LATE_LOG_DELAY) and the sum of squared LogDelay errors. Each
+update only recomputes the weeks that have predictions scored since the last
+update (see batch_scoring.py), so the dashboard reads a handful of rows
+however long the monitoring history grows. The histograms of the monitoring
+data are likewise counted in the database, see `count_trips`.
+"""
+
+import math
+
+import pandas as pd
+
+from batch_scoring import TRIP_KEY, _quoted, connect
+
+# Trips are late if the delay is longer than 5 minutes (300 seconds):
+# log(300) = 5.7.
+LATE_LOG_DELAY = 5.7
+
+
+def update_metrics(username: str, model_version: str, db_uri: str) -> int:
+    """
+    Recompute the weeks of `model_version`'s metrics that have new
+    predictions. Returns the number of weeks updated.
+    """
+    metrics = f"{username}_monitoring_metrics"
+    late = f'm."LogDelay" > {LATE_LOG_DELAY}'
+    predicted_late = f"p.preds > {LATE_LOG_DELAY}"
+    week = 'CAST(date_trunc(\'week\', {}."Date") AS DATE)'
+
+    with connect(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {metrics} (
+                "ModelVersion" TEXT,
+                "WindowStart" DATE,
+                "NumTrips" BIGINT,
+                "TruePositives" BIGINT,
+                "FalsePositives" BIGINT,
+                "FalseNegatives" BIGINT,
+                "TrueNegatives" BIGINT,
+                "SumSquaredError" DOUBLE PRECISION,
+                "ScoredThrough" TIMESTAMPTZ,
+                PRIMARY KEY ("ModelVersion", "WindowStart")
+            )
+            """
+        )
+        # "ScoredThrough" is the newest prediction a week's row includes, so
+        # the weeks to update are those with predictions newer than that.
+        cursor.execute(
+            f"""
+            INSERT INTO {metrics}
+            SELECT
+                p."ModelVersion",
+                {week.format("m")} AS "WindowStart",
+                count(*) AS "NumTrips",
+                count(*) FILTER (WHERE {predicted_late} AND {late}) AS "TruePositives",
+                count(*) FILTER (WHERE {predicted_late} AND NOT {late}) AS "FalsePositives",
+                count(*) FILTER (WHERE NOT {predicted_late} AND {late}) AS "FalseNegatives",
+                count(*) FILTER (WHERE NOT {predicted_late} AND NOT {late}) AS "TrueNegatives",
+                sum((p.preds - m."LogDelay") ^ 2) AS "SumSquaredError",
+                max(p."ScoredAt") AS "ScoredThrough"
+            FROM {username}_monitoring_data AS m
+            JOIN {username}_monitoring_predictions AS p USING ({_quoted(TRIP_KEY)})
+            WHERE p."ModelVersion" = $1
+            AND {week.format("m")} IN (
+                SELECT {week.format("p")}
+                FROM {username}_monitoring_predictions AS p
+                WHERE "ModelVersion" = $1
+                AND "ScoredAt" > COALESCE(
+                    (SELECT max("ScoredThrough") FROM {metrics} WHERE "ModelVersion" = $1),
+                    CAST('-infinity' AS TIMESTAMPTZ)
+                )
+            )
+            GROUP BY 1, 2
+            ON CONFLICT ("ModelVersion", "WindowStart") DO UPDATE SET
+                "NumTrips" = EXCLUDED."NumTrips",
+                "TruePositives" = EXCLUDED."TruePositives",
+                "FalsePositives" = EXCLUDED."FalsePositives",
+                "FalseNegatives" = EXCLUDED."FalseNegatives",
+                "TrueNegatives" = EXCLUDED."TrueNegatives",
+                "SumSquaredError" = EXCLUDED."SumSquaredError",
+                "ScoredThrough" = EXCLUDED."ScoredThrough"
+            RETURNING "WindowStart"
+            """,
+            parameters=(model_version,),
+        )
+        num_weeks = len(cursor.fetchall())
+        conn.commit()
+    return num_weeks
+
+
+def read_metrics(username: str, model_version: str, db_uri: str) -> pd.DataFrame:
+    """
+    `model_version`'s weekly accuracy, recall and RMSE in the same layout as
+    `vetiver.compute_metrics`, ready for `vetiver.plot_metrics`.
+    """
+    with connect(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT * FROM {username}_monitoring_metrics
+            WHERE "ModelVersion" = $1
+            ORDER BY "WindowStart"
+            """,
+            parameters=(model_version,),
+        )
+        windows = cursor.fetch_arrow_table().to_pylist()
+
+    rows = []
+    for window in windows:
+        n = window["NumTrips"]
+        tp, fn = window["TruePositives"], window["FalseNegatives"]
+        tn = window["TrueNegatives"]
+        estimates = {
+            "accuracy_score": (tp + tn) / n,
+            "recall_score": tp / (tp + fn) if tp + fn else 0.0,
+            "root_mean_squared_error": math.sqrt(window["SumSquaredError"] / n),
+        }
+        for metric, estimate in estimates.items():
+            rows.append(
+                {
+                    "index": pd.Timestamp(window["WindowStart"]),
+                    "n": n,
+                    "metric": metric,
+                    "estimate": estimate,
+                }
+            )
+    return pd.DataFrame(rows, columns=["index", "n", "metric", "estimate"])
+
+
+def count_trips(
+    username: str, db_uri: str, column: str, bin_width: float | None = None
+) -> pd.DataFrame:
+    """
+    The number of monitoring trips ("NumTrips") for each value of `column`,
+    or with `bin_width`, for each bin of that width (labelled by its lower
+    edge), ready to plot as a histogram.
+    """
+    value = f'"{column}"'
+    if bin_width is not None:
+        value = f"floor({value} / {float(bin_width)}) * {float(bin_width)}"
+
+    with connect(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT {value} AS "{column}", count(*) AS "NumTrips"
+            FROM {username}_monitoring_data
+            GROUP BY 1
+            ORDER BY 1
+            """
+        )
+        return cursor.fetch_arrow_table().to_pandas()
@@ -0,0 +1,108 @@
+import datetime
+import sys
+from pathlib import Path
+
+import adbc_driver_manager.dbapi
+import duckdb
+import polars as pl
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+import batch_scoring  # noqa: E402
+
+
+class HourModel:
+    """
+    Predicts a trip's hour as its LogDelay, so every prediction can be
+    checked against the trip it was made for.
+    """
+
+    def predict(self, trips: pl.DataFrame):
+        return trips["Hour"].cast(pl.Float64).to_numpy()
+
+
+def connect_duckdb(db_uri: str):
+    return adbc_driver_manager.dbapi.connect(
+        driver=duckdb.duckdb.__file__,
+        entrypoint="duckdb_adbc_init",
+        db_kwargs={"path": db_uri},
+    )
+
+
+def monitoring_trips(days: range) -> pl.DataFrame:
+    """
+    Two trips an hour for every day in `days`, from one vessel and route,
+    with each trip recorded twice like the overlapping downloads do.
+    """
+    trips = pl.DataFrame(
+        {
+            "Vessel": "tokitae",
+            "Departing": "seattle",
+            "Arriving": "bainbridge island",
+            "Date": [datetime.date(2024, 7, day) for day in days for _ in (1, 2)],
+            "Hour": [hour for _ in days for hour in (8, 17)],
+            "departing_temperature_2m": 15.0,
+            "LogDelay": 5.0,
+        }
+    )
+    return pl.concat([trips, trips])
+
+
+def append_trips(db_uri: str, trips: pl.DataFrame) -> None:
+    with connect_duckdb(db_uri) as conn, conn.cursor() as cursor:
+        table_name = "ferry_fan_monitoring_data"
+        mode = "append" if batch_scoring.table_exists(conn, table_name) else "create"
+        cursor.adbc_ingest(table_name, trips.to_arrow(), mode=mode)
+        conn.commit()
+
+
+@pytest.fixture
+def db_uri(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_scoring, "connect", connect_duckdb)
+    return str(tmp_path / "monitoring.duckdb")
+
+
+def read_predictions(db_uri: str) -> pl.DataFrame:
+    with connect_duckdb(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT * FROM ferry_fan_monitoring_predictions")
+        return pl.from_arrow(cursor.fetch_arrow_table())
+
+
+def test_each_trip_is_scored_once_per_model_version(db_uri):
+    append_trips(db_uri, monitoring_trips(range(1, 4)))
+    model = HourModel()
+
+    # the duplicated trips are scored once
+    num_scored = batch_scoring.score_new_trips(
+        model, "ferry_fan", "1", db_uri, batch_rows=4, max_workers=2
+    )
+    assert num_scored == 6
+    assert batch_scoring.score_new_trips(model, "ferry_fan", "1", db_uri) == 0
+
+    # only the trips added since are scored
+    append_trips(db_uri, monitoring_trips(range(4, 6)))
+    assert batch_scoring.score_new_trips(model, "ferry_fan", "1", db_uri) == 4
+
+    # a new model version scores every trip again
+    assert batch_scoring.score_new_trips(model, "ferry_fan", "2", db_uri) == 10
+
+    predictions = read_predictions(db_uri)
+    assert predictions.height == 20
+    assert predictions.select(*batch_scoring.TRIP_KEY, "ModelVersion").is_unique().all()
+    assert (predictions["preds"] == predictions["Hour"]).all()
+
+
+def test_scored_trips_of_recent_weeks(db_uri):
+    append_trips(db_uri, monitoring_trips(range(1, 31)))
+    batch_scoring.score_new_trips(HourModel(), "ferry_fan", "1", db_uri, max_workers=1)
+
+    scored_trips = batch_scoring.read_scored_trips("ferry_fan", "1", db_uri)
+    assert scored_trips.height == 120
+    assert (scored_trips["preds"] == scored_trips["Hour"]).all()
+
+    recent_trips = batch_scoring.read_scored_trips("ferry_fan", "1", db_uri, weeks=1)
+    assert recent_trips["Date"].min() == datetime.date(2024, 7, 24)
+    assert recent_trips.height == 7 * 4
+
+    assert batch_scoring.read_scored_trips("ferry_fan", "2", db_uri).is_empty()
@@ -0,0 +1,73 @@
+import datetime
+import sys
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1]))
+# the reference histograms are made when the model is trained
+sys.path.append(str(Path(__file__).parents[2] / "03-model-training"))
+
+from drift import PSI_ALERT, _bin_shares, drift_by_window  # noqa: E402
+from drift_reference import reference_histograms  # noqa: E402
+
+
+def training_data(n_rows: int = 5_000, seed: int = 2) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2024, 7, 1) + datetime.timedelta(days=int(day))
+                for day in rng.integers(0, 14, n_rows)
+            ],
+            "departing_temperature_2m": rng.normal(12, 6, n_rows),
+            "Vessel": rng.choice(["chelan", "tokitae", "walla walla"], n_rows),
+        }
+    )
+
+
+@pytest.fixture(scope="module")
+def data() -> pl.DataFrame:
+    return training_data()
+
+
+@pytest.fixture(scope="module")
+def reference(data) -> dict:
+    return reference_histograms(data, ["departing_temperature_2m"], ["Vessel"])
+
+
+def test_bin_shares_count_unseen_categories_and_nulls(reference):
+    data = pl.DataFrame({"Vessel": ["chelan", "chelan", "kaleetan", None]})
+    shares = data.select(
+        share.alias(str(i)) for i, share in enumerate(_bin_shares("Vessel", reference["Vessel"]))
+    ).row(0)
+    assert shares == (0.5, 0, 0, 0.25, 0.25)
+
+
+def test_training_data_has_no_drift(data, reference):
+    drift = drift_by_window(data, reference)
+    assert drift["window"].to_list() == [datetime.date(2024, 7, 1), datetime.date(2024, 7, 8)]
+    assert drift["n"].sum() == data.height
+    assert drift["departing_temperature_2m_psi"].max() < 0.01
+    assert drift["Vessel_psi"].max() < 0.01
+    assert drift["departing_temperature_2m_ks"].max() < 0.05
+
+
+def test_drift_is_detected(data, reference):
+    warmer = data.with_columns(pl.col("departing_temperature_2m") + 6)
+    drift = drift_by_window(warmer, reference)
+    assert (drift["departing_temperature_2m_psi"] > PSI_ALERT).all()
+    assert (drift["departing_temperature_2m_ks"] > 0.3).all()
+    assert (drift["Vessel_psi"] < 0.01).all()
+
+    new_vessel = data.with_columns(
+        pl.when(pl.col("Vessel") == "tokitae")
+        .then(pl.lit("kaleetan"))
+        .otherwise(pl.col("Vessel"))
+        .alias("Vessel")
+    )
+    drift = drift_by_window(new_vessel, reference)
+    assert (drift["Vessel_psi"] > PSI_ALERT).all()
+    assert (drift["departing_temperature_2m_psi"] < 0.01).all()
@@ -0,0 +1,103 @@
+import datetime
+import sys
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+import batch_scoring  # noqa: E402
+import metrics_store  # noqa: E402
+from test_batch_scoring import HourModel, append_trips, connect_duckdb  # noqa: E402
+
+
+def trips(days: list[int], hour: int, log_delay: float) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "Vessel": "tokitae",
+            "Departing": "seattle",
+            "Arriving": "bainbridge island",
+            "Date": [datetime.date(2024, 7, day) for day in days],
+            "Hour": hour,
+            "LogDelay": log_delay,
+        }
+    )
+
+
+@pytest.fixture
+def db_uri(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_scoring, "connect", connect_duckdb)
+    monkeypatch.setattr(metrics_store, "connect", connect_duckdb)
+    return str(tmp_path / "monitoring.duckdb")
+
+
+def read_metrics_table(db_uri: str) -> pl.DataFrame:
+    with connect_duckdb(db_uri) as conn, conn.cursor() as cursor:
+        cursor.execute('SELECT * FROM ferry_fan_monitoring_metrics ORDER BY "WindowStart"')
+        return pl.from_arrow(cursor.fetch_arrow_table())
+
+
+def score_and_update(db_uri: str) -> int:
+    batch_scoring.score_new_trips(HourModel(), "ferry_fan", "1", db_uri, max_workers=1)
+    return metrics_store.update_metrics("ferry_fan", "1", db_uri)
+
+
+def test_only_weeks_with_new_predictions_are_updated(db_uri):
+    # HourModel predicts LogDelay 8: late. Two weeks, starting on Mondays
+    # July 1 and July 8; the trips of the first are late, of the second not.
+    append_trips(db_uri, trips([1, 2, 3], hour=8, log_delay=6.0))
+    append_trips(db_uri, trips([8, 9], hour=8, log_delay=5.0))
+    assert score_and_update(db_uri) == 2
+
+    first_update = read_metrics_table(db_uri)
+    assert first_update["WindowStart"].to_list() == [
+        datetime.date(2024, 7, 1),
+        datetime.date(2024, 7, 8),
+    ]
+    assert first_update["NumTrips"].to_list() == [3, 2]
+    assert first_update["TruePositives"].to_list() == [3, 0]
+    assert first_update["FalsePositives"].to_list() == [0, 2]
+
+    # nothing new was scored, so nothing is recomputed
+    assert score_and_update(db_uri) == 0
+    assert read_metrics_table(db_uri).equals(first_update)
+
+    # new trips in the second week only update that week, in place
+    append_trips(db_uri, trips([10], hour=3, log_delay=6.0))
+    assert score_and_update(db_uri) == 1
+
+    second_update = read_metrics_table(db_uri)
+    assert second_update.height == 2
+    assert second_update.row(0) == first_update.row(0)
+    week = second_update.row(1, named=True)
+    assert week["NumTrips"] == 3
+    assert week["FalseNegatives"] == 1
+    assert week["ScoredThrough"] > first_update["ScoredThrough"][1]
+
+
+def test_metrics_in_vetiver_layout(db_uri):
+    append_trips(db_uri, trips([1, 2], hour=8, log_delay=6.0))
+    append_trips(db_uri, trips([3, 4], hour=3, log_delay=6.0))
+    score_and_update(db_uri)
+
+    metrics = metrics_store.read_metrics("ferry_fan", "1", db_uri)
+    estimates = dict(zip(metrics["metric"], metrics["estimate"]))
+    assert metrics["n"].unique().tolist() == [4]
+    assert estimates["accuracy_score"] == 0.5
+    assert estimates["recall_score"] == 0.5
+    assert estimates["root_mean_squared_error"] == pytest.approx(
+        ((2 * 2**2 + 2 * 3**2) / 4) ** 0.5
+    )
+
+
+def test_histograms_are_counted_in_the_database(db_uri):
+    append_trips(db_uri, trips([1, 2, 3], hour=8, log_delay=5.1))
+    append_trips(db_uri, trips([4], hour=8, log_delay=6.4))
+
+    assert metrics_store.count_trips("ferry_fan", db_uri, "Vessel").to_dict("list") == {
+        "Vessel": ["tokitae"],
+        "NumTrips": [4],
+    }
+    delay_counts = metrics_store.count_trips("ferry_fan", db_uri, "LogDelay", bin_width=0.5)
+    assert delay_counts.to_dict("list") == {"LogDelay": [5.0, 6.0], "NumTrips": [3, 1]}
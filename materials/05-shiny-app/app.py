@@ -4,8 +4,11 @@ import polars as pl
 from dotenv import load_dotenv
 from loguru import logger
 from shiny import App, ui
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
 
-from src.database import get_con
+from src import instrumentation
+from src.database import get_shared_con
 from src.modules.model_explorer import model_explorer_server, model_explorer_ui
 from src.modules.data_summary import data_summary_server, data_summary_ui
 
@@ -18,38 +21,49 @@ if Path(".env").exists():
 
 pl.Config(thousands_separator=True)
 
-# ------------------------------------------------------------------------------
-# State to share with all modules
-# ------------------------------------------------------------------------------
-con = get_con()
-
 # ------------------------------------------------------------------------------
 # UI logic
 # ------------------------------------------------------------------------------
-app_ui = ui.page_navbar(
-    ui.nav_panel(
-        "Model Explorer",
-        model_explorer_ui(
-            "model_explorer_module",
-            con=con
-        )
-    ),
-    ui.nav_panel(
-        "Data Summary",
-        data_summary_ui(
-            "data_summary_module",
-            con=con
-        )
-    ),
-    title="Seattle Ferry Model & Data Explorer",
-)
+# The UI is built per request, so the database connection it needs for the
+# route and vessel choices is opened when the first visitor arrives rather
+# than when the app starts. The choices themselves are cached.
+def app_ui(request):
+    con = get_shared_con()
+    return ui.page_navbar(
+        ui.nav_panel(
+            "Model Explorer",
+            model_explorer_ui(
+                "model_explorer_module",
+                con=con
+            )
+        ),
+        ui.nav_panel(
+            "Data Summary",
+            data_summary_ui(
+                "data_summary_module",
+                con=con
+            )
+        ),
+        title="Seattle Ferry Model & Data Explorer",
+    )
 
 # ------------------------------------------------------------------------------
 # Server logic
 # ------------------------------------------------------------------------------
 def server(input, output, session):
+    con = get_shared_con()
     model_explorer_server("model_explorer_module", con=con)
     data_summary_server("data_summary_module", con=con)
 
 
-app = App(app_ui, server)
\ No newline at end of file
+shiny_app = App(app_ui, server)
+
+# Serve the latency, row and byte counts recorded by src/instrumentation.py to
+# Prometheus next to the app, and log the slowest calls periodically.
+app = Starlette(
+    routes=[
+        Route("/metrics", instrumentation.metrics_endpoint),
+        Mount("/", app=shiny_app),
+    ]
+)
+instrumentation.start_summary_log()
@@ -0,0 +1,166 @@
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class CachedValue(Generic[T]):
+    """
+    A value that is loaded once per process and shared by every session.
+
+    The first call to `get` loads the value. Once the value is older than
+    `ttl` seconds, `get` keeps returning it while a background thread loads a
+    new one, so sessions never wait on a refresh. If the refresh fails the
+    old value is kept and the refresh is tried again on the next `get`.
+    """
+
+    def __init__(self, load: Callable[[], T], ttl: float, name: str = "value"):
+        self.load = load
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self._loaded_at: float | None = None
+        self._refreshing = False
+
+    def get(self) -> T:
+        with self._lock:
+            if self._loaded_at is None:
+                self._set(self.load())
+            elif not self._refreshing and time.monotonic() - self._loaded_at > self.ttl:
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh, name=f"refresh-{self.name}", daemon=True
+                ).start()
+            return self._value  # type: ignore[return-value]
+
+    def invalidate(self) -> None:
+        """
+        Force the next `get` to load the value again.
+        """
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+
+    def _set(self, value: T) -> None:
+        self._value = value
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        start = time.monotonic()
+        try:
+            value = self.load()
+        except Exception:
+            logger.exception(f"Failed to refresh {self.name!r}, keeping the cached value")
+            with self._lock:
+                self._refreshing = False
+            return
+        with self._lock:
+            self._set(value)
+            self._refreshing = False
+        logger.info(f"Refreshed {self.name!r} in {time.monotonic() - start:.4f}s")
+
+
+def ttl_cache(ttl: float) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Cache the result of a function for each set of (hashable) positional
+    arguments in a `CachedValue`.
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        values: dict[Hashable, CachedValue[T]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args: Hashable) -> T:
+            with lock:
+                if args not in values:
+                    values[args] = CachedValue(
+                        functools.partial(func, *args), ttl=ttl, name=func.__name__
+                    )
+                cached_value = values[args]
+            return cached_value.get()
+
+        wrapper.cache_clear = values.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+def estimated_size(value: object) -> int:
+    """
+    Approximate number of bytes held by a cached value.
+    """
+    if hasattr(value, "estimated_size"):
+        return value.estimated_size()  # polars DataFrame
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    A least recently used cache shared by every session, bounded by the
+    approximate size of the values it holds rather than their number.
+
+    Values are loaded outside the lock, so a slow query for one key does not
+    block lookups of other keys. Two sessions missing the same key at the
+    same time may both load it.
+    """
+
+    def __init__(self, max_bytes: int, name: str = "cache"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._values: OrderedDict[Hashable, tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, load: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key][0]  # type: ignore[return-value]
+            self.misses += 1
+
+        value = load()
+        size = estimated_size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key in self._values:
+                self.current_bytes -= self._values.pop(key)[1]
+            self._values[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._values.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._values),
+                "bytes": self.current_bytes,
+            }
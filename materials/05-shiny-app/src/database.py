@@ -1,16 +1,185 @@
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
 
 import ibis
-from ibis.backends.postgres import Backend
 from loguru import logger
+from shiny import reactive
 
-def get_con() -> Backend:
-    con = ibis.postgres.connect(
+from src.identity import get_username
+from src.instrumentation import bind_tags
+from src.replica import Replica
+
+if TYPE_CHECKING:
+    import polars as pl
+    from ibis.backends.postgres import Backend
+
+T = TypeVar("T")
+
+# The most queries that run against the database at the same time. Each
+# thread in the pool opens its own connection the first time it is used.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 4))
+
+_thread_local = threading.local()
+
+
+def _mark_pool_thread() -> None:
+    _thread_local.in_pool = True
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=DATABASE_POOL_SIZE,
+    thread_name_prefix="database",
+    initializer=_mark_pool_thread,
+)
+
+_shared_con: "Backend | None" = None
+_shared_con_lock = threading.Lock()
+
+# Set to a file name (e.g. "replica.duckdb") to copy the tables the app reads
+# into a local DuckDB file and serve every query from it, see src/replica.py.
+DATABASE_REPLICA = os.getenv("DATABASE_REPLICA")
+
+# How often the local copy is refreshed from Postgres.
+DATABASE_REPLICA_REFRESH_SECONDS = float(os.getenv("DATABASE_REPLICA_REFRESH_SECONDS", 900))
+
+# The tables the app reads. "{username}" is replaced with the Connect username.
+REPLICA_TABLES = [
+    "vessel_history_clean",
+    "vessel_verbose_clean",
+    "terminal_locations_clean",
+    "{username}_vessel_verbose_clean",
+    "{username}_route_delay_stats",
+    "{username}_route_delay_histogram",
+]
+
+
+def replica_tables() -> list[str]:
+    username = get_username()
+    return [table_name.format(username=username) for table_name in REPLICA_TABLES]
+
+
+def get_remote_con() -> "Backend":
+    return ibis.postgres.connect(
         database=os.environ["DATABASE_NAME_PYTHON"],
         host=os.environ["DATABASE_HOST"],
         user=os.environ["DATABASE_USER_PYTHON"],
         password=os.environ["DATABASE_PASSWORD_PYTHON"],
         schema=os.environ["DATABASE_SCHEMA"],
     )
+
+
+_replica = (
+    Replica(
+        DATABASE_REPLICA,
+        tables=replica_tables,
+        connect_remote=get_remote_con,
+        refresh_seconds=DATABASE_REPLICA_REFRESH_SECONDS,
+    )
+    if DATABASE_REPLICA
+    else None
+)
+
+
+def get_con() -> "Backend":
+    """
+    A connection to Postgres, or to the local replica when DATABASE_REPLICA
+    is set. The first connection to the replica waits for the tables to be
+    copied.
+    """
+    con = _replica.connect() if _replica is not None else get_remote_con()
     logger.info(f"{con=}")
     return con
+
+
+def get_shared_con() -> "Backend":
+    """
+    The connection shared by the UI and the cached reference data. It is
+    opened on first use rather than when the app is imported, so app
+    processes start without waiting for the database.
+    """
+    global _shared_con
+    with _shared_con_lock:
+        if _shared_con is None:
+            _shared_con = get_con()
+        return _shared_con
+
+
+def read_table(table_name: str) -> "pl.DataFrame":
+    """
+    A whole table. From Postgres it is read with ADBC, which is faster than
+    going through ibis for tables that are loaded in full.
+    """
+    if _replica is not None:
+        return get_shared_con().table(table_name).to_polars()
+
+    import polars as pl
+
+    database_uri = f"postgresql://{os.environ['DATABASE_USER_PYTHON']}:{os.environ['DATABASE_PASSWORD_PYTHON']}@{os.environ['DATABASE_HOST']}:5432/{os.environ['DATABASE_NAME_PYTHON']}?options=-csearch_path%3D{os.environ['DATABASE_SCHEMA']}"
+    return pl.read_database_uri(
+        query=f"SELECT * FROM {table_name};", uri=database_uri, engine="adbc"
+    )
+
+
+def get_thread_con() -> "Backend":
+    """
+    The connection belonging to the current database pool thread.
+    """
+    if not hasattr(_thread_local, "con"):
+        _thread_local.con = get_con()
+    return _thread_local.con
+
+
+async def run_query(query: Callable[..., T], *args: Any) -> T:
+    """
+    Run `query(con, *args)` on the database pool, where `con` is the pool
+    thread's own connection, without blocking the event loop. The query is
+    instrumented with the session and route of the caller.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, bind_tags(lambda: query(get_thread_con(), *args))
+    )
+
+
+def run_query_sync(query: Callable[..., T], *args: Any) -> T:
+    """
+    Run `query(con, *args)` on the database pool from synchronous code, such
+    as a cache's background refresh, and wait for the result. On a pool
+    thread the query runs straight away on that thread's connection, rather
+    than waiting for another pool thread.
+    """
+    if getattr(_thread_local, "in_pool", False):
+        return query(get_thread_con(), *args)
+    return _executor.submit(bind_tags(lambda: query(get_thread_con(), *args))).result()
+
+
+def query_calc(args: Callable[[], tuple], query: Callable[..., T]) -> Callable[[], T]:
+    """
+    A reactive calc whose value is `query(con, *args())`, run on the database
+    pool as an extended task. Must be used inside a server function, the same
+    as `reactive.calc`.
+
+    Whenever `args` changes the query is started again and the previous
+    result is discarded. Until the new result arrives, reading the calc
+    raises a silent exception, so outputs that depend on it wait instead of
+    holding up the rest of the session (or other sessions).
+    """
+
+    @reactive.extended_task
+    async def task(*task_args: Any) -> T:
+        return await run_query(query, *task_args)
+
+    @reactive.effect
+    def invoke():
+        task_args = args()
+        task.cancel()
+        task(*task_args)
+
+    @reactive.calc
+    def result() -> T:
+        return task.result()
+
+    return result
@@ -0,0 +1,55 @@
+import time
+from typing import Callable, TypeVar
+
+from shiny import reactive
+
+T = TypeVar("T")
+
+
+def debounce(delay_secs: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """
+    Turn a reactive calc into one that only updates after its dependencies
+    have stopped changing for `delay_secs`. Must be used inside a server
+    function, the same as `reactive.calc`.
+
+    Dragging a slider sends every intermediate value to the server. With
+    `@debounce(0.5)` on top of `@reactive.calc`, anything that reads the calc
+    is only invalidated once the slider has settled.
+    """
+
+    def wrapper(f: Callable[[], T]) -> Callable[[], T]:
+        when = reactive.value(None)
+        trigger = reactive.value(0)
+
+        @reactive.effect(priority=102)
+        def primer():
+            # Take a dependency on `f` and push the deadline back every time
+            # it is invalidated.
+            try:
+                f()
+            except Exception:
+                pass
+            finally:
+                when.set(time.time() + delay_secs)
+
+        @reactive.effect(priority=101)
+        def timer():
+            deadline = when()
+            if deadline is None:
+                return
+            time_left = deadline - time.time()
+            if time_left <= 0:
+                with reactive.isolate():
+                    when.set(None)
+                    trigger.set(trigger() + 1)
+            else:
+                reactive.invalidate_later(time_left)
+
+        @reactive.calc
+        @reactive.event(trigger, ignore_none=False)
+        def debounced() -> T:
+            return f()
+
+        return debounced
+
+    return wrapper
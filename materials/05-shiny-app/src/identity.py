@@ -0,0 +1,68 @@
+import os
+import threading
+from typing import Protocol
+
+from loguru import logger
+
+
+class IdentityProvider(Protocol):
+    def username(self) -> str: ...
+
+
+class ConnectIdentityProvider:
+    """
+    The Posit Connect user that owns `CONNECT_API_KEY`. The tables the app
+    reads are prefixed with this username.
+
+    The username is looked up once per process: from the `CONNECT_USERNAME`
+    environment variable when it is set, otherwise with one call to the
+    Connect API that is then remembered.
+    """
+
+    def __init__(self):
+        self._username: str | None = None
+        self._lock = threading.Lock()
+
+    def username(self) -> str:
+        with self._lock:
+            if self._username is None:
+                self._username = os.getenv("CONNECT_USERNAME") or self._lookup_username()
+            return self._username
+
+    @staticmethod
+    def _lookup_username() -> str:
+        from posit.connect import Client
+
+        with Client() as client:
+            username = client.me.username
+        logger.info(f"Resolved Connect username {username!r}")
+        return username
+
+
+class StaticIdentityProvider:
+    """
+    A fixed username, for running the app locally or in tests without Posit
+    Connect.
+    """
+
+    def __init__(self, username: str):
+        self._username = username
+
+    def username(self) -> str:
+        return self._username
+
+
+_provider: IdentityProvider = ConnectIdentityProvider()
+
+
+def get_identity_provider() -> IdentityProvider:
+    return _provider
+
+
+def set_identity_provider(provider: IdentityProvider) -> None:
+    global _provider
+    _provider = provider
+
+
+def get_username() -> str:
+    return _provider.username()
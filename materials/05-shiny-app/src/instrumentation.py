@@ -0,0 +1,336 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, TypeVar
+
+from loguru import logger
+from shiny.session import get_current_session
+from shiny.types import SilentCancelOutputException, SilentException
+
+from src.cache import estimated_size
+
+T = TypeVar("T")
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# How often the summary of the slowest calls is written to the log.
+METRICS_LOG_INTERVAL_SECONDS = float(os.getenv("METRICS_LOG_INTERVAL_SECONDS", 300))
+
+# Raised by reactives that are waiting on an input or an extended task. These
+# aren't counted as calls.
+NOT_ERRORS = (SilentException, SilentCancelOutputException)
+
+# Tags (such as the route) that the app attaches to everything a session
+# records, see set_session_tag.
+_session_tags: dict[str, dict[str, str]] = defaultdict(dict)
+
+# Tags for work that runs outside a session, e.g. on a database pool thread.
+_tags: contextvars.ContextVar[dict[str, str] | None] = contextvars.ContextVar(
+    "instrumentation_tags", default=None
+)
+
+
+class Histogram:
+    """
+    Counts of observations in LATENCY_BUCKETS, plus their number and sum.
+    """
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, upper in enumerate(LATENCY_BUCKETS):
+            if value <= upper:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by interpolating within the bucket it falls in,
+        the same way as Prometheus' histogram_quantile().
+        """
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for upper, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            if cumulative + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return LATENCY_BUCKETS[-1]
+
+
+class Series:
+    """
+    Everything recorded for one combination of kind, name and tags.
+    """
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def merge(self, other: "Series") -> None:
+        self.latency.merge(other.latency)
+        self.errors += other.errors
+        self.rows += other.rows
+        self.bytes += other.bytes
+
+
+class Registry:
+    """
+    The metrics recorded by this process, keyed by (kind, name, session,
+    route). `kind` is one of "reactive", "query" or "http".
+    """
+
+    def __init__(self):
+        self._series: dict[tuple[str, str, str, str], Series] = defaultdict(Series)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        seconds: float,
+        rows: int | None = None,
+        nbytes: int | None = None,
+        error: bool = False,
+    ) -> None:
+        tags = current_tags()
+        key = (kind, name, tags.get("session", ""), tags.get("route", ""))
+        with self._lock:
+            series = self._series[key]
+            series.latency.observe(seconds)
+            series.errors += error
+            series.rows += rows or 0
+            series.bytes += nbytes or 0
+
+    def end_session(self, session_id: str) -> None:
+        """
+        Fold an ended session's series into ones with an empty session tag,
+        so the number of series doesn't grow with every session while the
+        totals keep increasing.
+        """
+        with self._lock:
+            for key in [key for key in self._series if key[2] == session_id]:
+                kind, name, _, route = key
+                self._series[(kind, name, "", route)].merge(self._series.pop(key))
+
+    def by_name(self) -> dict[tuple[str, str], Series]:
+        """
+        Series combined across sessions and routes.
+        """
+        combined: dict[tuple[str, str], Series] = defaultdict(Series)
+        with self._lock:
+            for (kind, name, _, _), series in self._series.items():
+                combined[(kind, name)].merge(series)
+        return combined
+
+    def prometheus_text(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# TYPE shiny_app_latency_seconds histogram",
+        ]
+        counters: dict[str, list[str]] = {
+            "shiny_app_errors_total": [],
+            "shiny_app_rows_total": [],
+            "shiny_app_bytes_total": [],
+        }
+        with self._lock:
+            for (kind, name, session, route), series in sorted(self._series.items()):
+                labels = f'kind="{kind}",name="{name}",session="{session}",route="{route}"'
+                cumulative = 0
+                for upper, bucket_count in zip(
+                    (*LATENCY_BUCKETS, "+Inf"), series.latency.bucket_counts
+                ):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'shiny_app_latency_seconds_bucket{{{labels},le="{upper}"}} {cumulative}'
+                    )
+                lines.append(f"shiny_app_latency_seconds_sum{{{labels}}} {series.latency.sum}")
+                lines.append(f"shiny_app_latency_seconds_count{{{labels}}} {series.latency.count}")
+                counters["shiny_app_errors_total"].append(f"{{{labels}}} {series.errors}")
+                counters["shiny_app_rows_total"].append(f"{{{labels}}} {series.rows}")
+                counters["shiny_app_bytes_total"].append(f"{{{labels}}} {series.bytes}")
+        for metric, samples in counters.items():
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{sample}" for sample in samples)
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top: int = 10) -> str:
+        """
+        The `top` slowest kinds and names by p95 latency, one per line.
+        """
+        series_by_name = sorted(
+            self.by_name().items(), key=lambda item: -item[1].latency.quantile(0.95)
+        )
+        return "\n".join(
+            f"{kind:<8} {name:<40} n={series.latency.count:<6} "
+            f"p50={series.latency.quantile(0.5):.4f}s p95={series.latency.quantile(0.95):.4f}s "
+            f"errors={series.errors} rows={series.rows} bytes={series.bytes}"
+            for (kind, name), series in series_by_name[:top]
+        )
+
+
+registry = Registry()
+
+
+def current_tags() -> dict[str, str]:
+    """
+    The session and route to tag a measurement with: those bound with
+    `bind_tags`, otherwise those of the current Shiny session.
+    """
+    tags = _tags.get()
+    if tags is not None:
+        return tags
+    session = get_current_session()
+    if session is None:
+        return {}
+    return {"session": session.id, **_session_tags.get(session.id, {})}
+
+
+def bind_tags(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap `func` so that it records with the current tags wherever it is
+    called, e.g. once it has been handed to a thread pool.
+    """
+    tags = current_tags()
+
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        token = _tags.set(tags)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _tags.reset(token)
+
+    return wrapper
+
+
+def set_session_tag(session: Any, key: str, value: str) -> None:
+    """
+    Tag everything the session records from now on with `key=value`. The tags
+    are dropped, and the session's series folded together, when the session
+    ends.
+    """
+    session_id = session.id
+    if session_id not in _session_tags:
+        session.on_ended(lambda: end_session(session_id))
+    _session_tags[session_id][key] = value
+
+
+def end_session(session_id: str) -> None:
+    _session_tags.pop(session_id, None)
+    registry.end_session(session_id)
+
+
+def result_size(result: Any) -> tuple[int | None, int | None]:
+    """
+    Number of rows and approximate number of bytes of a query result.
+    """
+    if hasattr(result, "height"):
+        return result.height, result.estimated_size()  # polars DataFrame
+    if isinstance(result, dict):
+        return 1, estimated_size(result)
+    return None, None
+
+
+def instrument(kind: str, name: str | None = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Record the latency of every call to a function, and the size of what a
+    query returns. Works for plain and async functions.
+
+    Put it directly above the function, below `@reactive.calc`, `@render.*`
+    and the like, so it times the function itself rather than the reactive
+    wrapper (which returns cached values without running the function).
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        metric_name = name or func.__name__
+
+        def record(start: float, result: Any, error: bool) -> None:
+            rows, nbytes = result_size(result) if kind == "query" else (None, None)
+            registry.record(
+                kind, metric_name, time.perf_counter() - start, rows, nbytes, error
+            )
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> T:
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except (asyncio.CancelledError, *NOT_ERRORS):
+                    raise
+                except BaseException:
+                    record(start, None, error=True)
+                    raise
+                record(start, result, error=False)
+                return result
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except NOT_ERRORS:
+                raise
+            except BaseException:
+                record(start, None, error=True)
+                raise
+            record(start, result, error=False)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+async def metrics_endpoint(request: Any) -> Any:
+    """
+    Serve the metrics to Prometheus, see app.py.
+    """
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(
+        registry.prometheus_text(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def start_summary_log(interval: float = METRICS_LOG_INTERVAL_SECONDS) -> None:
+    """
+    Log the slowest calls every `interval` seconds from a background thread.
+    """
+
+    def log_summary():
+        while True:
+            time.sleep(interval)
+            summary = registry.summary()
+            if summary:
+                logger.info(f"Slowest calls by p95 latency:\n{summary}")
+
+    threading.Thread(target=log_summary, name="metrics-summary", daemon=True).start()
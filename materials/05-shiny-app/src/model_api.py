@@ -0,0 +1,58 @@
+import os
+import time
+from typing import TYPE_CHECKING
+
+from src.instrumentation import registry
+
+if TYPE_CHECKING:
+    import httpx
+
+_client: "httpx.AsyncClient | None" = None
+
+
+def get_client() -> "httpx.AsyncClient":
+    """
+    A single pooled client is shared by every session in the app process, so
+    predictions reuse open connections to the model API instead of opening a
+    new one for each request. httpx is imported when the first prediction is
+    made rather than when the app starts.
+    """
+    import httpx
+
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers={
+                "Authorization": f'Key {os.environ["CONNECT_API_KEY"]}',
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+            timeout=httpx.Timeout(float(os.getenv("FERRY_MODEL_API_TIMEOUT", 10)), connect=5),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def predict(prediction_input_data: list[dict]) -> list[float]:
+    """
+    Send one or more rows to the ferry delay model and return the predictions.
+    """
+    import httpx
+
+    start = time.perf_counter()
+    try:
+        response = await get_client().post(
+            os.environ["FERRY_MODEL_API_URL"], json=prediction_input_data
+        )
+        response.raise_for_status()
+    except httpx.HTTPError:
+        registry.record("http", "model_api.predict", time.perf_counter() - start, error=True)
+        raise
+    registry.record(
+        "http",
+        "model_api.predict",
+        time.perf_counter() - start,
+        rows=len(prediction_input_data),
+        nbytes=len(response.request.content) + len(response.content),
+    )
+    return response.json()["predict"]
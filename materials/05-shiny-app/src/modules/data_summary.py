@@ -1,16 +1,63 @@
-import great_tables.shiny as gts
+from typing import TYPE_CHECKING
+
 import ibis
+import polars as pl
 import polars.selectors as cs
-from great_tables import GT
 from ibis import _
-from ibis.backends.postgres import Backend
-from shiny import Inputs, Outputs, Session, module, ui
+from shiny import Inputs, Outputs, Session, module, render, ui
+
+from src.database import query_calc
+from src.identity import get_username
+from src.instrumentation import instrument
+
+if TYPE_CHECKING:
+    from ibis.backends.postgres import Backend
+
+
+@instrument("query", "route_stats")
+def query_route_stats(con: "Backend") -> pl.DataFrame:
+    # route_delay_stats is maintained by the data processing notebook and
+    # has one row of delay sums per route, day, weekday and hour.
+    username = get_username()
+
+    return (
+        con
+        .table(f"{username}_route_delay_stats")
+        .group_by(["Departing", "Arriving"])
+        .agg(
+            NumTrips=_.NumTrips.sum(),
+            SumDelay=_.SumDelay.sum(),
+            SumSquaredDelay=_.SumSquaredDelay.sum(),
+        )
+        .order_by(ibis.desc(_.SumDelay / _.NumTrips))
+        .to_polars()
+        .select(
+            "Departing",
+            "Arriving",
+            "NumTrips",
+            (pl.col("SumDelay") / pl.col("NumTrips")).alias("AverageDelay"),
+            # The sample standard deviation, which is undefined for a
+            # single trip.
+            pl.when(pl.col("NumTrips") >= 2)
+            .then(
+                (
+                    (pl.col("SumSquaredDelay") - pl.col("SumDelay").pow(2) / pl.col("NumTrips"))
+                    / (pl.col("NumTrips") - 1)
+                )
+                .clip(lower_bound=0)
+                .sqrt()
+            )
+            .alias("StandardDeviationDelay"),
+        )
+    )
 
 
 @module.ui
-def data_summary_ui(con: Backend):
+def data_summary_ui(con: "Backend"):
     return ui.tags.div(
-        gts.output_gt("table")
+        # The table is rendered to HTML by great_tables, which is only
+        # imported once the table is first shown.
+        ui.output_ui("table")
     )
 
 
@@ -19,27 +66,18 @@ def data_summary_server(
     input: Inputs,
     output: Outputs,
     session: Session,
-    con: Backend,
+    con: "Backend",
 ):
-    @output
-    @gts.render_gt
+    # The summary is read on the database pool, see src/database.py.
+    route_stats = query_calc(lambda: (), query_route_stats)
+
+    @render.ui
+    @instrument("reactive")
     def table():
-        df = (
-            con
-            .table("vessel_history_clean")
-            .mutate(
-                DelayMinutes=_.ActualDepart.delta(_.ScheduledDepart, "second") / 60
-            )
-            .group_by(["Departing", "Arriving"])
-            .agg(
-                NumTrips=_.Departing.count(),
-                AverageDelay=_.DelayMinutes.mean(),
-                StandardDeviationDelay=_.DelayMinutes.std(),
-            )
-            .order_by(ibis.desc("AverageDelay"))
-            .to_polars()
-        )
-        return (
+        from great_tables import GT
+
+        df = route_stats()
+        gt = (
             GT(df)
             .tab_header("Delay Stats by Route")
             .tab_spanner(label="Delay in Minutes", columns=cs.ends_with("Delay"))
@@ -65,3 +103,4 @@ def data_summary_server(
                 domain=[60_000, 0]
                 )
         )
+        return ui.HTML(gt.as_raw_html())
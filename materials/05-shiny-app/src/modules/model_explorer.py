@@ -1,34 +1,81 @@
+import asyncio
 import datetime
 import json
 import os
 import random
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import httpx
-import pandas as pd
-import plotly.express as px
+import ibis
 import polars as pl
 from ibis import _
-from ibis.backends.postgres import Backend
-from ipyleaflet import AntPath, AwesomeIcon, DivIcon, GeoJSON, Map, Marker
 from loguru import logger
-from posit.connect import Client
-from rich import inspect
-from rich.pretty import pprint
 from shiny import Inputs, Outputs, Session, module, reactive, render, ui
-from shinywidgets import output_widget, render_widget
 
-from src.timer import time_function
+from src import model_api
+from src.cache import LRUCache, ttl_cache
+from src.database import query_calc, read_table, run_query_sync
+from src.instrumentation import instrument, set_session_tag
+from src.reference_data import RecordIndex
+from src.identity import get_username
+from src.debounce import debounce
 
+if TYPE_CHECKING:
+    from ibis.backends.postgres import Backend
 
-def get_route_options(con: Backend) -> dict:
-    with Client() as client:
-        username = client.me.username
+# How long reference data that rarely changes (routes, vessels and terminals)
+# is shared between sessions before it is reloaded from the database.
+REFERENCE_DATA_TTL_SECONDS = float(os.getenv("REFERENCE_DATA_TTL_SECONDS", 3600))
+
+# Query results for a route are shared by all sessions, up to this many bytes.
+route_cache = LRUCache(
+    max_bytes=int(os.getenv("ROUTE_CACHE_MAX_MB", 256)) * 1024**2, name="route_cache"
+)
+
+
+def query_data_version(con: "Backend") -> tuple:
+    """
+    Changes whenever trips are added to the vessel history, so cached route
+    results from older data are no longer used. It is read from the same
+    table as the route queries, see route_trips.
+    """
+    version = (
+        con.table("vessel_history_clean")
+        .aggregate(
+            num_trips=_.count(),
+            last_scheduled_depart=_.ScheduledDepart.max(),
+        )
+        .to_polars()
+        .row(0)
+    )
+    return version
+
+
+@ttl_cache(ttl=60)
+def get_data_version() -> tuple:
+    """
+    The data version, shared by every session. It is loaded and refreshed on
+    the database pool with the pool thread's own connection, never on the
+    event loop or the shared connection.
+    """
+    return run_query_sync(query_data_version)
+
+
+@ttl_cache(ttl=REFERENCE_DATA_TTL_SECONDS)
+def read_reference_index(table_name: str, key: str) -> RecordIndex:
+    """
+    A small reference table, indexed by `key` when it is loaded.
+    """
+    return RecordIndex(read_table(table_name), key)
+
+
+@ttl_cache(ttl=REFERENCE_DATA_TTL_SECONDS)
+def get_route_options(con: "Backend") -> dict:
+    username = get_username()
 
     options_list = (
-        con.table(f"{username}_vessel_history_clean")
+        con.table(f"{username}_route_delay_stats")
         .group_by(["Departing", "Arriving"])
-        .aggregate(n=_.Departing.count())
+        .aggregate(n=_.NumTrips.sum())
         .order_by(_.n.desc())
         .to_polars()
         .to_dicts()
@@ -44,6 +91,150 @@ def get_route_options(con: Backend) -> dict:
     return options_dict
 
 
+def whole_minutes(seconds: float | None) -> int | None:
+    """
+    Convert a number of seconds to whole minutes, rounding towards zero like
+    polars' `dt.total_minutes()`.
+    """
+    if seconds is None:
+        return None
+    return int(seconds / 60)
+
+
+def route_trips(con: "Backend", departing: str, arriving: str) -> ibis.Table:
+    """
+    An ibis expression for the trips on a route. Nothing is read from the
+    database until one of the queries below executes it.
+    """
+    # fmt: off
+    return (
+        con
+        .table("vessel_history_clean").filter(
+            [
+                _.Departing == departing,
+                _.Arriving == arriving
+            ]
+        )
+        .mutate(
+            DelaySeconds=_.ActualDepart.epoch_seconds() - _.ScheduledDepart.epoch_seconds()
+        )
+    )
+    # fmt: on
+
+
+# The route queries below take a connection from the database pool, see
+# src/database.query_calc, and share their results between sessions through
+# route_cache for as long as the data version is unchanged.
+
+
+def query_route_cache_key(con: "Backend", departing: str, arriving: str) -> tuple:
+    """
+    The route and the data version its cached results belong to.
+    """
+    return (departing, arriving, get_data_version())
+
+
+def query_route_delay_summary(
+    con: "Backend", departing: str, arriving: str, data_version: tuple
+) -> dict[str, float]:
+    """
+    Average and standard deviation of the delay on a route, computed in the
+    database so only one row is returned.
+    """
+
+    @instrument("query", "route_delay_summary")
+    def query():
+        summary = route_trips(con, departing, arriving).aggregate(
+            num_trips=_.count(),
+            avg_delay_seconds=_.DelaySeconds.mean(),
+            std_delay_seconds=_.DelaySeconds.std(),
+        )
+        return summary.to_polars().to_dicts()[0]
+
+    return route_cache.get_or_load(("summary", departing, arriving, data_version), query)
+
+
+def query_delay_histogram(
+    con: "Backend", departing: str, arriving: str, data_version: tuple
+) -> pl.DataFrame:
+    """
+    Number of trips on a route in each of up to DELAY_HISTOGRAM_BINS equal
+    width bins of the delay. The trips are binned by the data processing
+    notebook into route_delay_histogram, so only one row per
+    DELAY_BIN_MINUTES of delay is read, and the plot is the same size for
+    every route.
+    """
+    username = get_username()
+
+    @instrument("query", "delay_histogram")
+    def query():
+        bins = (
+            con.table(f"{username}_route_delay_histogram")
+            .filter([_.Departing == departing, _.Arriving == arriving])
+            .group_by("DelayBin")
+            .aggregate(Count=_.NumTrips.sum())
+            .to_polars()
+        )
+        if bins.is_empty():
+            return pl.DataFrame(
+                schema={"BinStart": pl.Float64, "BinEnd": pl.Float64, "Count": pl.Int64}
+            )
+        # Whole stored bins are merged, so the bars line up with them.
+        lower = bins["DelayBin"].min()
+        upper = bins["DelayBin"].max() + DELAY_BIN_MINUTES
+        bin_width = DELAY_BIN_MINUTES * max(
+            1, -(-(upper - lower) // (DELAY_HISTOGRAM_BINS * DELAY_BIN_MINUTES))
+        )
+        return (
+            bins.group_by(((pl.col("DelayBin") - lower) // bin_width).alias("Bin"))
+            .agg(pl.col("Count").sum())
+            .sort("Bin")
+            .select(
+                (lower + pl.col("Bin") * bin_width).cast(pl.Float64).alias("BinStart"),
+                (lower + (pl.col("Bin") + 1) * bin_width)
+                .cast(pl.Float64)
+                .alias("BinEnd"),
+                pl.col("Count").cast(pl.Int64),
+            )
+        )
+
+    return route_cache.get_or_load(("histogram", departing, arriving, data_version), query)
+
+
+def query_route_history(
+    con: "Backend",
+    departing: str,
+    arriving: str,
+    data_version: tuple,
+    column: str,
+    direction: str,
+    page: int,
+) -> pl.DataFrame:
+    """
+    One page of trips on a route, sorted and paged by the database with
+    ORDER BY ... LIMIT ... OFFSET.
+    """
+
+    @instrument("query", "route_history")
+    def query():
+        sort_keys = [ibis.desc(column) if direction == "desc" else ibis.asc(column)]
+        # Break ties so that pages don't overlap.
+        if column != "ScheduledDepart":
+            sort_keys.append(ibis.desc("ScheduledDepart"))
+        sort_keys.append(ibis.asc("Vessel"))
+        return (
+            route_trips(con, departing, arriving)
+            .order_by(sort_keys)
+            .limit(ROUTE_HISTORY_PAGE_SIZE, offset=page * ROUTE_HISTORY_PAGE_SIZE)
+            .drop("DelaySeconds")
+            .to_polars()
+        )
+
+    return route_cache.get_or_load(
+        ("history", column, direction, page, departing, arriving, data_version), query
+    )
+
+
 def get_weather_code_options() -> dict[int, str]:
     """
     See API docs for details: https://open-meteo.com/en/docs.
@@ -96,13 +287,11 @@ def get_weather_code_options() -> dict[int, str]:
     }
 
 
-def sidebar(con: Backend):
-    sidebar_background_color = "#f8f8f8"
+@ttl_cache(ttl=REFERENCE_DATA_TTL_SECONDS)
+def get_vessel_names(con: "Backend") -> list[str]:
+    username = get_username()
 
-    with Client() as client:
-        username = client.me.username
-
-    vessel_names = (
+    return (
         con.table(f"{username}_vessel_verbose_clean")
         .select("VesselName")
         .to_polars()
@@ -110,6 +299,10 @@ def sidebar(con: Backend):
         .to_list()
     )
 
+
+def sidebar(con: "Backend"):
+    sidebar_background_color = "#f8f8f8"
+
     return ui.sidebar(
         ui.help_text(
             "The parameters below are inputs to the Ferry Delay Prediction Model. Adjust the parameters to see how they impact the predicted delay time."
@@ -118,7 +311,9 @@ def sidebar(con: Backend):
             ui.accordion_panel(
                 "Basic Information",
                 ui.input_select("selected_route", "Route", get_route_options(con)),
-                ui.input_select("selected_vessel_name", "Vessel Name", vessel_names),
+                ui.input_select(
+                    "selected_vessel_name", "Vessel Name", get_vessel_names(con)
+                ),
                 style=f"background-color: {sidebar_background_color};",
             ),
             ui.accordion_panel(
@@ -202,8 +397,93 @@ def sidebar(con: Backend):
     )
 
 
+# Number of bars in the distribution of delays plot.
+DELAY_HISTOGRAM_BINS = 50
+
+# Width of the bins of route_delay_histogram in minutes, see DELAY_BIN_MINUTES
+# in the data processing notebook's etl/stages.py.
+DELAY_BIN_MINUTES = 1
+
+# Inputs that can be swept in the "What-if Sweep" tab, with the values to
+# predict for. Weather features are set for both terminals, like the sliders.
+# Only features of the model are listed: precipitation isn't one, so sweeping
+# it would give a flat line.
+SWEEP_FEATURES = {
+    "Hour": ("Hour of Day", list(range(0, 24))),
+    "temperature_2m": ("Temperature (°C)", list(range(-30, 41, 2))),
+    "cloud_cover": ("Cloud Cover (%)", list(range(0, 101, 5))),
+    "wind_speed_10m": ("Wind Speed", list(range(0, 101, 5))),
+    "wind_gusts_10m": ("Wind Gusts", list(range(0, 101, 5))),
+}
+
+
+def sweep_prediction_input_data(
+    prediction_input_data: dict[str, Any], feature: str, values: list[int]
+) -> list[dict[str, Any]]:
+    """
+    One copy of `prediction_input_data` for each value of `feature`.
+    """
+    if feature in prediction_input_data:
+        columns = [feature]
+    else:
+        columns = [f"departing_{feature}", f"arriving_{feature}"]
+    return [
+        prediction_input_data | {column: value for column in columns}
+        for value in values
+    ]
+
+
+async def predict_sweep(
+    values: list[int], sweep_input_data: list[dict[str, Any]]
+) -> tuple[list[int], list[float]]:
+    """
+    Predict the delay for every row of the sweep in a single request.
+
+    The model rejects the whole request if one row has a category it wasn't
+    trained on, such as an hour with no sailings in the training data. Then
+    each row is predicted on its own and the values the model rejects are
+    left out, so the rest of the sweep can still be plotted.
+    """
+    import httpx
+
+    try:
+        return values, await model_api.predict(sweep_input_data)
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"Sweep rejected, predicting each value on its own: {e!r}")
+
+    results = await asyncio.gather(
+        *(model_api.predict([row]) for row in sweep_input_data), return_exceptions=True
+    )
+    predicted_values, predictions = [], []
+    for value, result in zip(values, results):
+        if isinstance(result, httpx.HTTPStatusError):
+            logger.warning(f"Leaving {value} out of the sweep: {result.response.text}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            predicted_values.append(value)
+            predictions.append(result[0])
+    return predicted_values, predictions
+
+
+# The route history table is paged in the database, so only the visible page
+# of trips is read, formatted and sent to the browser.
+ROUTE_HISTORY_PAGE_SIZE = 50
+
+ROUTE_HISTORY_SORT_OPTIONS = {
+    "ScheduledDepart desc": "Most recent first",
+    "ScheduledDepart asc": "Oldest first",
+    "DelaySeconds desc": "Longest delay first",
+    "DelaySeconds asc": "Shortest delay first",
+}
+
+
 @module.ui
-def model_explorer_ui(con: Backend):
+def model_explorer_ui(con: "Backend"):
+    # shinywidgets (and with it ipywidgets and IPython) is imported when the
+    # page is first built rather than when the app starts.
+    from shinywidgets import output_widget
+
     return ui.layout_sidebar(
         sidebar(con),
         # Value boxes
@@ -228,10 +508,38 @@ def model_explorer_ui(con: Backend):
         ),
         # Route history table
         ui.navset_card_pill(
-            ui.nav_panel("Route History", ui.output_data_frame("route_history_table")),
+            ui.nav_panel(
+                "Route History",
+                ui.layout_columns(
+                    ui.input_select(
+                        "route_history_sort",
+                        None,
+                        ROUTE_HISTORY_SORT_OPTIONS,
+                        width="100%",
+                    ),
+                    ui.input_action_button("route_history_previous_page", "Previous"),
+                    ui.output_text("route_history_page_text"),
+                    ui.input_action_button("route_history_next_page", "Next"),
+                    col_widths=(4, 2, 4, 2),
+                ),
+                ui.output_data_frame("route_history_table"),
+            ),
+            ui.nav_panel(
+                "What-if Sweep",
+                ui.input_select(
+                    "sweep_feature",
+                    None,
+                    {
+                        feature: label
+                        for feature, (label, values) in SWEEP_FEATURES.items()
+                    },
+                ),
+                output_widget("sweep_plot"),
+            ),
             ui.nav_panel("Vessel Details", ui.output_code("vessel_details_output")),
             ui.nav_panel("Vessel Drawing", ui.output_ui("vessel_drawing_output")),
             ui.nav_panel("Vessel Silhouette", ui.output_ui("vessel_silhouette_output")),
+            id="details_tabs",
         ),
     )
 
@@ -241,69 +549,97 @@ def model_explorer_server(
     input: Inputs,
     output: Outputs,
     session: Session,
-    con: Backend,
+    con: "Backend",
 ):
-    # Read in the datasets that are small and used by several
-    # different parts of the server.
-    database_uri = f"postgresql://{os.environ['DATABASE_USER_PYTHON']}:{os.environ['DATABASE_PASSWORD_PYTHON']}@{os.environ['DATABASE_HOST']}:5432/{os.environ['DATABASE_NAME_PYTHON']}?options=-csearch_path%3D{os.environ['DATABASE_SCHEMA']}"
+    from shinywidgets import render_widget
 
-    vessel_verbose = pl.read_database_uri(
-        query="SELECT * FROM vessel_verbose_clean;", uri=database_uri, engine="adbc"
-    )
+    # The datasets that are small and used by several different parts of the
+    # server are shared by all sessions, see read_reference_index.
+    vessels = read_reference_index("vessel_verbose_clean", "VesselName")
+    terminals = read_reference_index("terminal_locations_clean", "TerminalName")
 
-    terminal_locations = pl.read_database_uri(
-        query="SELECT * FROM terminal_locations_clean;", uri=database_uri, engine="adbc"
-    )
+    # Tag the latency and size of everything this session does with its
+    # route, see src/instrumentation.py. This runs before the debounced
+    # prediction input, the first thing to read the route.
+    @reactive.effect(priority=103)
+    def tag_route():
+        set_session_tag(session, "route", input.selected_route())
 
     @reactive.calc
+    @instrument("reactive")
     def get_starting_and_ending_terminal() -> tuple[str, str]:
         route = input.selected_route()
         start, end = [i.lower().strip() for i in route.split(" | ")]
         return start, end
 
-    @time_function
-    @reactive.calc
-    def filtered_vessel_history() -> pl.LazyFrame:
-        # fmt: off
-        starting_terminal_name, ending_terminal_name = get_starting_and_ending_terminal()
+    session.on_ended(lambda: logger.info(f"route_cache {route_cache.stats()}"))
 
-        df = (
-            con
-            .table("vessel_history_clean").filter(
-                [
-                    _.Departing == starting_terminal_name,
-                    _.Arriving == ending_terminal_name
-                ]
-            )
-            .to_polars()
-            .lazy()
-            .with_columns(
-                (pl.col("ActualDepart") - pl.col("ScheduledDepart")).alias("Delay"),
-            )
+    # The route queries, and the data version they are cached under, run on
+    # the database pool (see src/database.py), so a slow route doesn't hold
+    # up the rest of this session or other sessions.
+    route_cache_key = query_calc(get_starting_and_ending_terminal, query_route_cache_key)
+    route_delay_summary = query_calc(route_cache_key, query_route_delay_summary)
+
+    delay_histogram = query_calc(route_cache_key, query_delay_histogram)
+
+    route_history_page = reactive.value(0)
+
+    @reactive.calc
+    @instrument("reactive")
+    def route_history_num_pages() -> int:
+        num_trips = route_delay_summary()["num_trips"]
+        return max(1, -(-num_trips // ROUTE_HISTORY_PAGE_SIZE))
+
+    @reactive.effect
+    @reactive.event(input.selected_route, input.route_history_sort)
+    @instrument("reactive")
+    def reset_route_history_page():
+        route_history_page.set(0)
+
+    @reactive.effect
+    @reactive.event(input.route_history_previous_page)
+    @instrument("reactive")
+    def previous_route_history_page():
+        route_history_page.set(max(0, route_history_page() - 1))
+
+    @reactive.effect
+    @reactive.event(input.route_history_next_page)
+    @instrument("reactive")
+    def next_route_history_page():
+        route_history_page.set(
+            min(route_history_num_pages() - 1, route_history_page() + 1)
         )
-        # fmt: on
-        return df
 
     @reactive.calc
+    @instrument("reactive")
+    def route_history_args() -> tuple:
+        column, direction = input.route_history_sort().split()
+        return (*route_cache_key(), column, direction, route_history_page())
+
+    route_history = query_calc(route_history_args, query_route_history)
+
+    @render.text
+    @instrument("reactive")
+    def route_history_page_text():
+        num_trips = route_delay_summary()["num_trips"]
+        first_trip = route_history_page() * ROUTE_HISTORY_PAGE_SIZE + 1
+        last_trip = min(num_trips, first_trip + ROUTE_HISTORY_PAGE_SIZE - 1)
+        return f"Trips {first_trip:,} to {last_trip:,} of {num_trips:,}"
+
+    @reactive.calc
+    @instrument("reactive")
     def get_selected_vessel_data() -> dict[str, Any]:
-        selected_vessel_data = vessel_verbose.filter(
-            pl.col("VesselName") == input.selected_vessel_name()
-        )
-        return selected_vessel_data.to_dicts()[0]
+        return vessels[input.selected_vessel_name()]
 
+    # Wait for the sidebar inputs to settle before asking the model API for
+    # a prediction, instead of sending one for every value a slider passes.
+    @debounce(0.5)
     @reactive.calc
-    @time_function
-    def predict_delay() -> float:
-        """
-        The delay model is hosted on Posit Connect at this URL:
-        https://connect.posit.it/content/823c479e-3d5e-4898-8801-a5c2cec97bb5
-        """
-        logger.info("Predicting ferry delay...")
+    @instrument("reactive")
+    def prediction_input_data() -> dict[str, Any]:
         # Based on the selected vessel name, get all of the data related to that
         # vessel.
-        selected_vessel_data = vessel_verbose.filter(
-            pl.col("VesselName") == input.selected_vessel_name()
-        ).to_dicts()[0]
+        selected_vessel_data = get_selected_vessel_data()
 
         # Some of the vessels have not been rebuilt. When this applies, impute
         # the current year as the year rebuilt.
@@ -312,7 +648,7 @@ def model_explorer_server(
         else:
             year_rebuilt = datetime.datetime.now().year
 
-        prediction_input_data = {
+        return {
             "Vessel": str(selected_vessel_data["VesselName"]),
             "Departing": str(get_starting_and_ending_terminal()[0]),
             "Arriving": str(get_starting_and_ending_terminal()[1]),
@@ -344,218 +680,229 @@ def model_explorer_server(
             "arriving_wind_gusts_10m": int(input.selected_wind_gust()),
         }
 
-        # Make the prediction
-        endpoint_url = os.environ["FERRY_MODEL_API_URL"]
+    @reactive.extended_task
+    async def predict_delay_task(prediction_input_data: dict[str, Any]) -> float:
+        """
+        The delay model is hosted on Posit Connect at this URL:
+        https://connect.posit.it/content/823c479e-3d5e-4898-8801-a5c2cec97bb5
+        """
+        import httpx
 
-        headers = {
-            "Authorization": f'Key {os.environ["CONNECT_API_KEY"]}',
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
+        logger.info("Predicting ferry delay...")
+        try:
+            predictions = await model_api.predict([prediction_input_data])
+        except httpx.HTTPError as e:
+            logger.error(prediction_input_data)
+            logger.error(f"{e!r}")
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error(f"{e.response.text}")
+            return random.randint(-3, 23)
 
-        with httpx.Client() as client:
-            response = httpx.post(
-                endpoint_url, headers=headers, json=[prediction_input_data]
-            )
+        logger.info(f"Model response: {predictions}")
+        return round(predictions[0], 1)
 
-        logger.info(f"{response=}")
+    last_prediction_input_data = reactive.value(None)
 
-        if response.status_code != 200:
-            logger.error(prediction_input_data)
-            logger.error(f"{response.text}")
-            logger.error(response.request.url)
-            logger.error(response.request.headers)
-            logger.error(response.request.content)
-            return random.randint(-3, 23)
-        else:
-            logger.info(f"Model response: {response.json()}")
-            return round(response.json()["predict"][0], 1)
+    @reactive.effect
+    @instrument("reactive")
+    def request_prediction():
+        current_input_data = prediction_input_data()
+        with reactive.isolate():
+            if current_input_data == last_prediction_input_data():
+                return
+        last_prediction_input_data.set(current_input_data)
+        # A prediction for inputs that have since changed is no longer needed,
+        # so cancel it before requesting a prediction for the current inputs.
+        predict_delay_task.cancel()
+        predict_delay_task(current_input_data)
+
+    @reactive.calc
+    @instrument("reactive")
+    def predict_delay() -> float:
+        return predict_delay_task.result()
+
+    @reactive.extended_task
+    async def sweep_task(
+        feature: str, values: list[int], sweep_input_data: list[dict[str, Any]]
+    ) -> tuple[str, list[int], list[float]] | None:
+        import httpx
+
+        logger.info(f"Predicting ferry delay for {len(sweep_input_data)} {feature} values...")
+        try:
+            return feature, *await predict_sweep(values, sweep_input_data)
+        except httpx.HTTPError as e:
+            logger.error(f"{e!r}")
+            return None
+
+    @reactive.effect
+    @instrument("reactive")
+    def request_sweep():
+        # Only sweep while the tab is open, the sweep costs a request with
+        # one row per value.
+        if input.details_tabs() != "What-if Sweep":
+            return
+        feature = input.sweep_feature()
+        _label, values = SWEEP_FEATURES[feature]
+        sweep_task.cancel()
+        sweep_task(
+            feature,
+            values,
+            sweep_prediction_input_data(prediction_input_data(), feature, values),
+        )
+
+    @render_widget
+    @instrument("reactive")
+    def sweep_plot():
+        import plotly.graph_objects as go
+
+        # Created once, like the delay distribution plot.
+        return go.Figure(
+            go.Scatter(mode="lines+markers", line_color="red"),
+            layout=go.Layout(yaxis_title="Predicted Delay (minutes)"),
+        )
+
+    @reactive.effect
+    @instrument("reactive")
+    def update_sweep_plot():
+        fig = sweep_plot.widget
+        if fig is None:
+            return
+
+        sweep = sweep_task.result()
+        if sweep is None:
+            return
+        feature, values, predictions = sweep
+        label, _values = SWEEP_FEATURES[feature]
+        with fig.batch_update():
+            fig.data[0].update(x=values, y=[round(p, 1) for p in predictions])
+            fig.layout.xaxis.title = label
 
     @render.text
+    @instrument("reactive")
     def predicted_delay_text():
         return f"{predict_delay()} minutes"
 
     @render.text
+    @instrument("reactive")
     def average_delay_text():
-        avg_delay = (
-            filtered_vessel_history()
-            .select(pl.col("Delay").mean().dt.total_minutes())
-            .collect()
-            .item()
-        )
+        avg_delay = whole_minutes(route_delay_summary()["avg_delay_seconds"])
         return f"{avg_delay} minutes"
 
     @render.text
+    @instrument("reactive")
     def std_delay_text():
-        standard_deviation_delay = (
-            filtered_vessel_history()
-            .select(pl.col("Delay").std().dt.total_minutes())
-            .collect()
-            .item()
+        standard_deviation_delay = whole_minutes(
+            route_delay_summary()["std_delay_seconds"]
         )
         return f"{standard_deviation_delay} minutes"
 
     @render_widget
+    @instrument("reactive")
     def map():
-        # Get terminal data
-        (
-            starting_terminal_name,
-            ending_terminal_name,
-        ) = get_starting_and_ending_terminal()
-
-        starting_terminal_data = (
-            terminal_locations.filter(
-                pl.col("TerminalName").eq(starting_terminal_name)
-            ).to_dicts()
-        )[0]
-
-        ending_terminal_data = (
-            terminal_locations.filter(
-                pl.col("TerminalName").eq(ending_terminal_name)
-            ).to_dicts()
-        )[0]
-
-        # Remember latitude runs east -> west
-        # longitude runs north -> south
-
-        # Figure out the starting bounds
-        if starting_terminal_data["Latitude"] > ending_terminal_data["Latitude"]:
-            north = starting_terminal_data["Latitude"]
-            south = ending_terminal_data["Latitude"]
-        else:
-            north = ending_terminal_data["Latitude"]
-            south = starting_terminal_data["Latitude"]
+        # No reactive dependencies, so the map is created once per session.
+        # The effects below update its layers in place.
+        from src.route_map import RouteMap
 
-        if starting_terminal_data["Longitude"] > ending_terminal_data["Longitude"]:
-            east = starting_terminal_data["Longitude"]
-            west = ending_terminal_data["Longitude"]
-        else:
-            east = ending_terminal_data["Longitude"]
-            west = starting_terminal_data["Longitude"]
-
-        # The lat/lon bounds in the form [[south, west], [north, east]].
-        starting_bounds = [
-            [south - 0.02, west - 0.01],
-            [north + 0.02, east + 0.01],
-        ]
-
-        # Create map
-        map = Map()
-        map.fit_bounds(starting_bounds)
-        map.add_layer(
-            GeoJSON(
-                style={
-                    "opacity": 1,
-                    "dashArray": "9",
-                    "fillOpacity": 0.1,
-                    "weight": 1,
-                },
-                hover_style={"color": "white", "dashArray": "0", "fillOpacity": 0.5},
-            )
-        )
+        return RouteMap()
 
-        # Add the Hyatt as a marker
-        hyatt_regency_seattle_location = (47.61453555315236, -122.33406011740034)
-        hotel_icon = AwesomeIcon(name="hotel", marker_color="blue")
-        map.add_layer(
-            Marker(
-                location=hyatt_regency_seattle_location,
-                draggable=False,
-                icon=hotel_icon,
-            )
-        )
+    @reactive.effect
+    @instrument("reactive")
+    def update_map_route():
+        route_map = map.widget
+        if route_map is None:
+            return
 
-        # Add the terminals as markers
-        for start_finish, terminal in zip(
-            ["start", "finish"], [starting_terminal_data, ending_terminal_data]
-        ):
-            # Look up the terminal location
-            # Create a marker for each terminal.
-            if start_finish == "start":
-                ferry_icon = AwesomeIcon(name="ship", marker_color="green")
-            else:
-                ferry_icon = AwesomeIcon(name="flag-checkered", marker_color="black")
-            text = DivIcon(
-                html=terminal["TerminalName"].title(),
-                icon_size=(len(terminal["TerminalName"]) * 7, 20),
-            )
-            map.add_layer(
-                Marker(
-                    location=(terminal["Latitude"] - 0.005, terminal["Longitude"]),
-                    icon=text,
-                )
-            )
-            marker = Marker(
-                location=(terminal["Latitude"], terminal["Longitude"]),
-                draggable=False,
-                title=f'{terminal["TerminalName"].title()} ({terminal["Latitude"]}, {terminal["Longitude"]})',
-                icon=ferry_icon,
-            )
-            map.add_layer(marker)
+        starting_terminal_name, ending_terminal_name = get_starting_and_ending_terminal()
+        route_map.show_route(terminals[starting_terminal_name], terminals[ending_terminal_name])
+
+    @reactive.effect
+    @instrument("reactive")
+    def update_map_delay():
+        route_map = map.widget
+        if route_map is None:
+            return
 
-        # Add path between terminals
         prediction = predict_delay()
-        avg_delay = (
-            filtered_vessel_history()
-            .select(pl.col("Delay").mean().dt.total_minutes())
-            .collect()
-            .item()
-        )
+        avg_delay = whole_minutes(route_delay_summary()["avg_delay_seconds"])
+        route_map.show_delay(prediction, avg_delay)
 
-        # When the prediction is greater than the average delay, the line will
-        # be red and the pulse will be yellow. The line will also move slower.
-        if prediction > avg_delay:
-            ant_line_colour = "red"
-            ant_line_pulse_colour = "yellow"
-            delay = 5_000
-        else:
-            ant_line_colour = "green"
-            ant_line_pulse_colour = "blue"
-            delay = 1_000
-
-        ant_path = AntPath(
-            locations=[
-                (
-                    starting_terminal_data["Latitude"],
-                    starting_terminal_data["Longitude"],
-                ),
-                (ending_terminal_data["Latitude"], ending_terminal_data["Longitude"]),
-            ],
-            dash_array=[1, 10],
-            delay=delay,
-            color=ant_line_colour,
-            pulse_color=ant_line_pulse_colour,
+    @render_widget
+    @instrument("reactive")
+    def distribution_of_delays_plot():
+        # Like the map, the figure is created once per session and the
+        # effects below update the bars and the prediction line in place.
+        import plotly.graph_objects as go
+
+        return go.Figure(
+            go.Bar(
+                hovertemplate="%{customdata[0]:.1f} to %{customdata[1]:.1f} minutes: %{y:,}<extra></extra>",
+            ),
+            layout=go.Layout(
+                xaxis_title="Delay (minutes)", yaxis_title="Count", bargap=0
+            ),
         )
 
-        map.add(ant_path)
+    @reactive.effect
+    @instrument("reactive")
+    def update_delay_histogram():
+        fig = distribution_of_delays_plot.widget
+        if fig is None:
+            return
+
+        df = delay_histogram()
+        with fig.batch_update():
+            fig.data[0].update(
+                x=((df["BinStart"] + df["BinEnd"]) / 2).to_numpy(),
+                y=df["Count"].to_numpy(),
+                width=(df["BinEnd"] - df["BinStart"]).to_numpy(),
+                customdata=df.select("BinStart", "BinEnd").to_numpy(),
+            )
 
-        return map
+    @reactive.effect
+    @instrument("reactive")
+    def update_prediction_line():
+        fig = distribution_of_delays_plot.widget
+        if fig is None:
+            return
 
-    @render_widget
-    def distribution_of_delays_plot():
+        # The same shape and annotation as fig.add_vline, which does not work
+        # inside batch_update.
         prediction = predict_delay()
-        df = (
-            filtered_vessel_history()
-            .select(pl.col("Delay").dt.total_minutes())
-            .collect()
-            .to_pandas()
-        )
-        fig = px.histogram(
-            df, x="Delay", labels={"Delay": "Delay (minutes)", "count": "Count"}
-        )
-        fig.add_vline(
-            x=prediction,
-            line_color="red",
-            annotation_text=f"Prediction ({prediction} minutes)",
-            annotation=dict(font_color="red"),
-        )
-        return fig
+        with fig.batch_update():
+            fig.layout.shapes = [
+                dict(
+                    type="line",
+                    x0=prediction,
+                    x1=prediction,
+                    xref="x",
+                    y0=0,
+                    y1=1,
+                    yref="y domain",
+                    line_color="red",
+                )
+            ]
+            fig.layout.annotations = [
+                dict(
+                    x=prediction,
+                    xref="x",
+                    xanchor="left",
+                    y=1,
+                    yref="y domain",
+                    yanchor="top",
+                    text=f"Prediction ({prediction} minutes)",
+                    showarrow=False,
+                    font_color="red",
+                )
+            ]
 
     @render.data_frame
+    @instrument("reactive")
     def route_history_table():
         df = (
-            filtered_vessel_history()
-            .sort("ScheduledDepart", descending=True)
+            route_history()
+            .with_columns(
+                (pl.col("ActualDepart") - pl.col("ScheduledDepart")).alias("Delay"),
+            )
             .select(
                 pl.col(pl.String).str.to_titlecase(),
                 pl.col("ScheduledDepart")
@@ -566,11 +913,11 @@ def model_explorer_server(
                 .alias("Actual Departure"),
                 pl.col("Delay").dt.total_minutes().alias("Delay (Minutes)"),
             )
-            .collect()
         )
         return render.DataGrid(df, width="100%", summary=False)
 
     @render.code
+    @instrument("reactive")
     def vessel_details_output():
         selected_vessel_data = get_selected_vessel_data()
 
@@ -587,11 +934,13 @@ def model_explorer_server(
         return json.dumps(selected_vessel_data, default=json_default, indent=4)
 
     @render.ui
+    @instrument("reactive")
     def vessel_drawing_output():
         selected_vessel_data = get_selected_vessel_data()
         return ui.tags.img(src=selected_vessel_data["DrawingImg"])
 
     @render.ui
+    @instrument("reactive")
     def vessel_silhouette_output():
         selected_vessel_data = get_selected_vessel_data()
         return ui.tags.img(src=selected_vessel_data["SilhouetteImg"])
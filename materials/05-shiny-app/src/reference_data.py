@@ -0,0 +1,28 @@
+from typing import Any, Hashable
+
+import polars as pl
+
+
+class RecordIndex:
+    """
+    The rows of a reference table as dicts, keyed by one of its columns, so
+    a record is looked up in O(1) instead of filtering the table.
+
+    The records are shared by every session and must not be modified.
+    """
+
+    def __init__(self, df: pl.DataFrame, key: str):
+        self.key = key
+        self._records = {record[key]: record for record in df.iter_rows(named=True)}
+
+    def __getitem__(self, value: Hashable) -> dict[str, Any]:
+        try:
+            return self._records[value]
+        except KeyError:
+            raise KeyError(f"No record with {self.key}={value!r}") from None
+
+    def __contains__(self, value: Hashable) -> bool:
+        return value in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import duckdb
+    from ibis.backends.duckdb import Backend as DuckDBBackend
+    from ibis.backends.postgres import Backend
+
+
+class Replica:
+    """
+    A local DuckDB copy of the tables the app reads, so queries are served
+    without a round trip to Postgres.
+
+    `start` copies the tables once and then again every `refresh_seconds`
+    from a background thread. Each table is replaced in a single
+    transaction, so queries see either the old or the new copy, and if a
+    refresh fails the previous copy keeps being served.
+
+    Every app process keeps its own file (the process id is added to `path`)
+    because a DuckDB file can only be written by one process at a time.
+    Files left behind by processes that have exited are removed when the
+    next process starts.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tables: Callable[[], list[str]],
+        connect_remote: Callable[[], "Backend"],
+        refresh_seconds: float,
+    ):
+        self._base_path = Path(path)
+        self.path = str(self._name(os.getpid()))
+        self.tables = tables
+        self.connect_remote = connect_remote
+        self.refresh_seconds = refresh_seconds
+        self._writer: "duckdb.DuckDBPyConnection | None" = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Copy the tables, unless that has already happened, and schedule the
+        refreshes.
+        """
+        with self._lock:
+            if self._started:
+                return
+            import duckdb
+
+            self._remove_stale_copies()
+            self._writer = duckdb.connect(self.path)
+            self.sync()
+            threading.Thread(
+                target=self._refresh_forever, name="replica-refresh", daemon=True
+            ).start()
+            self._started = True
+
+    def sync(self) -> None:
+        """
+        Copy every table from Postgres, streaming it in record batches.
+        Tables that don't exist in Postgres are skipped, so a table that
+        hasn't been written yet only breaks the queries that read it.
+        """
+        assert self._writer is not None
+        start = time.monotonic()
+        remote = self.connect_remote()
+        try:
+            remote_tables = set(remote.list_tables())
+            for table_name in self.tables():
+                if table_name not in remote_tables:
+                    logger.warning(f"Table {table_name!r} does not exist, not copying it to the replica")
+                    continue
+                batches = remote.table(table_name).to_pyarrow_batches()
+                self._writer.begin()
+                self._writer.register("_batches", batches)
+                try:
+                    self._writer.execute(
+                        f'CREATE OR REPLACE TABLE "{table_name}" AS SELECT * FROM _batches'
+                    )
+                    self._writer.commit()
+                except Exception:
+                    self._writer.rollback()
+                    raise
+                finally:
+                    self._writer.unregister("_batches")
+        finally:
+            remote.disconnect()
+        logger.info(f"Synced the replica {self.path!r} in {time.monotonic() - start:.4f}s")
+
+    def connect(self) -> "DuckDBBackend":
+        """
+        A connection to the replica. Connections opened in the same process
+        share the database, so they see each refresh as soon as it commits.
+        """
+        import ibis
+
+        self.start()
+        return ThreadLocalConnection(lambda: ibis.duckdb.connect(self.path))  # type: ignore[return-value]
+
+    def _refresh_forever(self) -> None:
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.sync()
+            except Exception:
+                logger.exception(f"Failed to sync the replica {self.path!r}, keeping the old copy")
+
+    def _name(self, pid: int | str) -> Path:
+        return self._base_path.with_name(
+            f"{self._base_path.stem}-{pid}{self._base_path.suffix}"
+        )
+
+    def _remove_stale_copies(self) -> None:
+        for path in self._base_path.parent.glob(self._name("*").name):
+            pid = path.stem.removeprefix(f"{self._base_path.stem}-")
+            if pid.isdigit() and not _process_exists(int(pid)):
+                path.unlink(missing_ok=True)
+                Path(f"{path}.wal").unlink(missing_ok=True)
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ThreadLocalConnection:
+    """
+    Stands in for an ibis DuckDB connection that is shared between threads,
+    such as the one from `get_shared_con`. Using one DuckDB connection from
+    several threads at once crashes the process, so every thread is given
+    its own connection, opened the first time the thread uses this one.
+    """
+
+    def __init__(self, connect: Callable[[], "DuckDBBackend"]):
+        self._connect = connect
+        self._thread_local = threading.local()
+
+    def __getattr__(self, name: str):
+        if not hasattr(self._thread_local, "con"):
+            self._thread_local.con = self._connect()
+        return getattr(self._thread_local.con, name)
@@ -0,0 +1,113 @@
+from ipyleaflet import AntPath, AwesomeIcon, DivIcon, GeoJSON, Map, Marker
+
+
+class RouteMap(Map):
+    """
+    Map of the selected route. The map and its layers are created once, and
+    `show_route` and `show_delay` update the existing layers so only small
+    changes are sent to the browser.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.add(
+            GeoJSON(
+                style={
+                    "opacity": 1,
+                    "dashArray": "9",
+                    "fillOpacity": 0.1,
+                    "weight": 1,
+                },
+                hover_style={"color": "white", "dashArray": "0", "fillOpacity": 0.5},
+            )
+        )
+
+        # Add the Hyatt as a marker
+        hyatt_regency_seattle_location = (47.61453555315236, -122.33406011740034)
+        hotel_icon = AwesomeIcon(name="hotel", marker_color="blue")
+        self.add(
+            Marker(
+                location=hyatt_regency_seattle_location,
+                draggable=False,
+                icon=hotel_icon,
+            )
+        )
+
+        # Path between the terminals
+        self.ant_path = AntPath(locations=[], dash_array=[1, 10])
+        self.add(self.ant_path)
+
+        # A marker and a text label for each terminal
+        self.terminal_markers = {
+            "start": Marker(
+                draggable=False, icon=AwesomeIcon(name="ship", marker_color="green")
+            ),
+            "finish": Marker(
+                draggable=False,
+                icon=AwesomeIcon(name="flag-checkered", marker_color="black"),
+            ),
+        }
+        self.terminal_labels = {"start": Marker(), "finish": Marker()}
+        for start_finish in ["start", "finish"]:
+            self.add(self.terminal_labels[start_finish])
+            self.add(self.terminal_markers[start_finish])
+
+    def show_route(self, starting_terminal_data: dict, ending_terminal_data: dict):
+        # Remember latitude runs east -> west
+        # longitude runs north -> south
+
+        # Figure out the starting bounds
+        if starting_terminal_data["Latitude"] > ending_terminal_data["Latitude"]:
+            north = starting_terminal_data["Latitude"]
+            south = ending_terminal_data["Latitude"]
+        else:
+            north = ending_terminal_data["Latitude"]
+            south = starting_terminal_data["Latitude"]
+
+        if starting_terminal_data["Longitude"] > ending_terminal_data["Longitude"]:
+            east = starting_terminal_data["Longitude"]
+            west = ending_terminal_data["Longitude"]
+        else:
+            east = ending_terminal_data["Longitude"]
+            west = starting_terminal_data["Longitude"]
+
+        # The lat/lon bounds in the form [[south, west], [north, east]].
+        self.fit_bounds(
+            [
+                [south - 0.02, west - 0.01],
+                [north + 0.02, east + 0.01],
+            ]
+        )
+
+        # Move the terminal markers
+        for start_finish, terminal in zip(
+            ["start", "finish"], [starting_terminal_data, ending_terminal_data]
+        ):
+            self.terminal_labels[start_finish].location = (
+                terminal["Latitude"] - 0.005,
+                terminal["Longitude"],
+            )
+            self.terminal_labels[start_finish].icon = DivIcon(
+                html=terminal["TerminalName"].title(),
+                icon_size=(len(terminal["TerminalName"]) * 7, 20),
+            )
+            marker = self.terminal_markers[start_finish]
+            marker.location = (terminal["Latitude"], terminal["Longitude"])
+            marker.title = f'{terminal["TerminalName"].title()} ({terminal["Latitude"]}, {terminal["Longitude"]})'
+
+        self.ant_path.locations = [
+            (starting_terminal_data["Latitude"], starting_terminal_data["Longitude"]),
+            (ending_terminal_data["Latitude"], ending_terminal_data["Longitude"]),
+        ]
+
+    def show_delay(self, prediction: float, avg_delay: float):
+        # When the prediction is greater than the average delay, the line will
+        # be red and the pulse will be yellow. The line will also move slower.
+        if prediction > avg_delay:
+            self.ant_path.color = "red"
+            self.ant_path.pulse_color = "yellow"
+            self.ant_path.delay = 5_000
+        else:
+            self.ant_path.color = "green"
+            self.ant_path.pulse_color = "blue"
+            self.ant_path.delay = 1_000
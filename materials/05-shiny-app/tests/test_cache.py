@@ -0,0 +1,142 @@
+import threading
+from types import SimpleNamespace
+
+import polars as pl
+import pytest
+
+from src import cache
+from src.cache import CachedValue, LRUCache, estimated_size, ttl_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000.0)
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock.now)
+    return clock
+
+
+class Loader:
+    """
+    Returns 1, 2, 3, ... and can be made to block or fail.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.loaded = threading.Event()
+        self.fail = False
+
+    def __call__(self) -> int:
+        self.release.wait(timeout=5)
+        self.calls += 1
+        self.loaded.set()
+        if self.fail:
+            raise ConnectionError("database down")
+        return self.calls
+
+
+def wait_for(condition) -> None:
+    event = threading.Event()
+    for _ in range(500):
+        if condition():
+            return
+        event.wait(0.01)
+    raise AssertionError("timed out")
+
+
+def test_cached_value_is_refreshed_in_the_background(clock):
+    load = Loader()
+    value = CachedValue(load, ttl=60)
+    assert value.get() == 1
+    clock.now += 30
+    assert value.get() == 1
+    assert load.calls == 1
+
+    # once stale, the old value is served while the refresh runs
+    load.release.clear()
+    clock.now += 31
+    assert value.get() == 1
+    assert value.get() == 1
+    load.release.set()
+    wait_for(lambda: value.get() == 2)
+    assert load.calls == 2
+
+
+def test_failed_refresh_keeps_the_old_value(clock):
+    load = Loader()
+    value = CachedValue(load, ttl=60)
+    value.get()
+
+    load.fail = True
+    load.loaded.clear()
+    clock.now += 61
+    assert value.get() == 1
+    assert load.loaded.wait(timeout=5)
+    wait_for(lambda: not value._refreshing)
+
+    # the old value is kept, and the refresh is tried again on the next get
+    load.fail = False
+    assert value.get() == 1
+    wait_for(lambda: value.get() == 3)
+
+
+def test_invalidate_loads_again(clock):
+    load = Loader()
+    value = CachedValue(load, ttl=60)
+    value.get()
+    value.invalidate()
+    assert value.get() == 2
+
+
+def test_ttl_cache_caches_per_arguments(clock):
+    calls = []
+
+    @ttl_cache(ttl=60)
+    def route(departing: str, arriving: str) -> str:
+        calls.append((departing, arriving))
+        return f"{departing}-{arriving}"
+
+    assert route("seattle", "bainbridge") == "seattle-bainbridge"
+    assert route("seattle", "bainbridge") == "seattle-bainbridge"
+    assert route("edmonds", "kingston") == "edmonds-kingston"
+    assert calls == [("seattle", "bainbridge"), ("edmonds", "kingston")]
+
+    route.cache_clear()
+    route("seattle", "bainbridge")
+    assert len(calls) == 3
+
+
+def test_lru_cache_is_bounded_by_bytes():
+    frame = pl.DataFrame({"NumTrips": range(100)})
+    size = estimated_size(frame)
+    lru = LRUCache(max_bytes=2 * size)
+
+    assert lru.get_or_load("a", lambda: frame) is frame
+    assert lru.get_or_load("a", lambda: pytest.fail("loaded a hit")) is frame
+    lru.get_or_load("b", lambda: frame)
+    lru.get_or_load("a", lambda: frame)  # "b" is now the least recently used
+    lru.get_or_load("c", lambda: frame)
+
+    assert lru.stats() == {
+        "hits": 2,
+        "misses": 3,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 2 * size,
+    }
+    loads = []
+    lru.get_or_load("b", lambda: loads.append("b") or frame)
+    assert loads == ["b"]
+
+
+def test_lru_cache_skips_values_larger_than_max_bytes():
+    lru = LRUCache(max_bytes=estimated_size(pl.DataFrame({"NumTrips": range(10)})))
+    large = pl.DataFrame({"NumTrips": range(1_000)})
+
+    assert lru.get_or_load("large", lambda: large) is large
+    assert lru.stats()["entries"] == 0
+    assert lru.stats()["bytes"] == 0
+
+    lru.clear()
+    assert lru.stats()["misses"] == 1
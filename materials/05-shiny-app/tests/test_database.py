@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from src import database
+
+
+def thread_name(con) -> str:
+    return threading.current_thread().name
+
+
+def test_run_query_sync_uses_the_pool(monkeypatch):
+    monkeypatch.setattr(database, "get_con", lambda: f"con for {threading.current_thread().name}")
+
+    def query(con, suffix):
+        return con, threading.current_thread().name + suffix
+
+    # from a background thread (e.g. a cache refresh) the query is handed to
+    # the pool, with the pool thread's connection
+    con, name = database.run_query_sync(query, "!")
+    assert name.startswith("database") and name.endswith("!")
+    assert con == f"con for {name[:-1]}"
+
+    # on the pool, e.g. from a query already running there, it runs inline
+    # rather than waiting for another pool thread
+    def nested(con):
+        return threading.current_thread().name, database.run_query_sync(thread_name)
+
+    outer, inner = asyncio.run(database.run_query(nested))
+    assert outer == inner
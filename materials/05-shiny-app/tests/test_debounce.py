@@ -0,0 +1,32 @@
+import asyncio
+
+from shiny import reactive
+
+from src.debounce import debounce
+
+
+def test_debounce_coalesces_rapid_changes():
+    async def drag_slider() -> list[int]:
+        slider = reactive.value(0)
+        seen = []
+
+        @debounce(0.2)
+        @reactive.calc
+        def doubled():
+            return slider() * 2
+
+        @reactive.effect
+        def record():
+            seen.append(doubled())
+
+        await reactive.flush()
+        # every intermediate value of a drag, faster than the delay
+        for value in range(1, 6):
+            slider.set(value)
+            await reactive.flush()
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.5)
+        await reactive.flush()
+        return seen
+
+    assert asyncio.run(drag_slider()) == [0, 10]
@@ -0,0 +1,30 @@
+import ibis
+import pyarrow as pa
+
+from src.modules import model_explorer
+from src.modules.model_explorer import DELAY_HISTOGRAM_BINS, query_delay_histogram
+
+
+def test_stored_bins_are_merged_into_a_fixed_number_of_bars(monkeypatch):
+    monkeypatch.setattr(model_explorer, "get_username", lambda: "alice")
+    delay_bins = list(range(-10, 140))
+    con = ibis.duckdb.connect()
+    con.create_table(
+        "alice_route_delay_histogram",
+        pa.table(
+            {
+                "Departing": ["seattle"] * len(delay_bins) + ["edmonds"],
+                "Arriving": ["bainbridge"] * (len(delay_bins) + 1),
+                "DelayBin": [*delay_bins, 500],
+                "NumTrips": [1] * len(delay_bins) + [7],
+            }
+        ),
+    )
+
+    df = query_delay_histogram(con, "seattle", "bainbridge", data_version=(1,))
+    assert df.height <= DELAY_HISTOGRAM_BINS
+    assert (df["BinStart"][0], df["BinEnd"][-1]) == (-10, 140)
+    assert (df["BinEnd"] - df["BinStart"]).unique().to_list() == [3]
+    assert df["Count"].sum() == len(delay_bins)
+
+    assert query_delay_histogram(con, "kingston", "edmonds", data_version=(1,)).is_empty()
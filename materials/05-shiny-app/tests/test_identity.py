@@ -0,0 +1,33 @@
+from src import identity
+from src.identity import ConnectIdentityProvider, StaticIdentityProvider
+
+
+def test_connect_username_is_looked_up_once(monkeypatch):
+    monkeypatch.delenv("CONNECT_USERNAME", raising=False)
+    calls = []
+
+    def lookup_username():
+        calls.append(1)
+        return "ferry_fan"
+
+    provider = ConnectIdentityProvider()
+    monkeypatch.setattr(provider, "_lookup_username", lookup_username)
+
+    assert provider.username() == "ferry_fan"
+    assert provider.username() == "ferry_fan"
+    assert len(calls) == 1
+
+
+def test_connect_username_from_environment(monkeypatch):
+    monkeypatch.setenv("CONNECT_USERNAME", "ferry_fan")
+    provider = ConnectIdentityProvider()
+    monkeypatch.setattr(provider, "_lookup_username", lambda: 1 / 0)
+
+    assert provider.username() == "ferry_fan"
+
+
+def test_static_identity_provider(monkeypatch):
+    monkeypatch.setattr(identity, "_provider", identity.get_identity_provider())
+    identity.set_identity_provider(StaticIdentityProvider("tester"))
+
+    assert identity.get_username() == "tester"
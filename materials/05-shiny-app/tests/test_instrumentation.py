@@ -0,0 +1,54 @@
+import pytest
+from shiny.types import SilentException
+
+from src import instrumentation
+from src.instrumentation import Histogram, Registry, instrument
+
+
+def test_histogram_quantile():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.observe(0.004)
+    for _ in range(10):
+        histogram.observe(0.7)
+
+    assert 0.0025 < histogram.quantile(0.5) <= 0.005
+    assert 0.5 < histogram.quantile(0.95) <= 1
+
+
+def test_instrument_records_errors_but_not_silent_exceptions(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(instrumentation, "registry", registry)
+
+    @instrument("reactive")
+    def waiting():
+        raise SilentException()
+
+    @instrument("reactive")
+    def failing():
+        raise ValueError()
+
+    with pytest.raises(SilentException):
+        waiting()
+    with pytest.raises(ValueError):
+        failing()
+
+    series = registry.by_name()
+    assert ("reactive", "waiting") not in series
+    assert series[("reactive", "failing")].errors == 1
+
+
+def test_ended_session_is_folded_into_totals(monkeypatch):
+    registry = Registry()
+    for session in ["a", "b"]:
+        monkeypatch.setattr(
+            instrumentation, "current_tags", lambda: {"session": session, "route": "r"}
+        )
+        registry.record("query", "route_history", 0.1, rows=50)
+
+    registry.end_session("a")
+    registry.end_session("b")
+
+    text = registry.prometheus_text()
+    assert 'shiny_app_rows_total{kind="query",name="route_history",session="",route="r"} 100' in text
+    assert 'session="a"' not in text
@@ -0,0 +1,17 @@
+import polars as pl
+import pytest
+
+from src.reference_data import RecordIndex
+
+
+def test_record_index_lookup():
+    vessels = RecordIndex(
+        pl.DataFrame({"VesselName": ["cathlamet", "chelan"], "EngineCount": [2, 4]}),
+        key="VesselName",
+    )
+
+    assert vessels["chelan"] == {"VesselName": "chelan", "EngineCount": 4}
+    assert "cathlamet" in vessels
+    assert len(vessels) == 2
+    with pytest.raises(KeyError, match="walla walla"):
+        vessels["walla walla"]
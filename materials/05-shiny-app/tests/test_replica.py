@@ -0,0 +1,53 @@
+import ibis
+import pyarrow as pa
+import pytest
+
+from src.replica import Replica
+
+
+def test_replica_serves_the_last_synced_copy(tmp_path):
+    remote_tables = {"route_delay_stats": pa.table({"NumTrips": [1, 2, 3]})}
+
+    def connect_remote():
+        con = ibis.duckdb.connect()
+        for table_name, table in remote_tables.items():
+            con.create_table(table_name, table)
+        return con
+
+    replica = Replica(
+        str(tmp_path / "replica.duckdb"),
+        tables=lambda: ["route_delay_stats"],
+        connect_remote=connect_remote,
+        refresh_seconds=3600,
+    )
+    con = replica.connect()
+    assert con.table("route_delay_stats").NumTrips.sum().execute() == 6
+
+    remote_tables["route_delay_stats"] = pa.table({"NumTrips": [10]})
+    replica.sync()
+    assert con.table("route_delay_stats").NumTrips.sum().execute() == 10
+
+    def remote_down():
+        raise ConnectionError("remote down")
+
+    replica.connect_remote = remote_down
+    with pytest.raises(ConnectionError):
+        replica.sync()
+    assert con.table("route_delay_stats").NumTrips.sum().execute() == 10
+
+
+def test_missing_tables_are_skipped(tmp_path):
+    def connect_remote():
+        con = ibis.duckdb.connect()
+        con.create_table("vessel_history_clean", pa.table({"NumTrips": [1, 2]}))
+        return con
+
+    replica = Replica(
+        str(tmp_path / "replica.duckdb"),
+        tables=lambda: ["not_written_yet", "vessel_history_clean"],
+        connect_remote=connect_remote,
+        refresh_seconds=3600,
+    )
+    con = replica.connect()
+    assert con.table("vessel_history_clean").NumTrips.sum().execute() == 3
+    assert "not_written_yet" not in con.list_tables()
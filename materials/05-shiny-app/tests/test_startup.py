@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent.parent
+
+# Cumulative `python -X importtime` budget for `import app`, in seconds. The
+# app imported in about 0.7s when this was written.
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", 1.5))
+
+# Only needed once a page or output is rendered.
+LAZY_MODULES = [
+    "great_tables",
+    "httpx",
+    "ipyleaflet",
+    "ipywidgets",
+    "pandas",
+    "plotly",
+    "posit",
+    "shinywidgets",
+    "ibis.backends.postgres",
+]
+
+
+def import_app() -> tuple[dict[str, int], list[str]]:
+    """
+    Import the app in a fresh interpreter. Returns the cumulative import time
+    in microseconds of each module, and the modules that were loaded.
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import sys, app; print('\\n'.join(sys.modules))",
+        ],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, module = line.removeprefix("import time:").split("|")
+            import_times[module.strip()] = int(cumulative)
+    return import_times, result.stdout.split()
+
+
+def test_app_imports_within_budget():
+    import_times, _ = import_app()
+    assert import_times["app"] / 1e6 < STARTUP_IMPORT_BUDGET_SECONDS
+
+
+def test_heavy_modules_are_imported_lazily():
+    _, modules = import_app()
+    assert [m for m in LAZY_MODULES if m in modules] == []
@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import model_api
+from src.modules.model_explorer import predict_sweep, sweep_prediction_input_data
+
+# Hours that had no sailings in the training data, which the model's one-hot
+# encoder rejects.
+UNKNOWN_HOURS = {2, 3}
+
+
+@pytest.fixture
+def requests(monkeypatch) -> list[list[int]]:
+    requests = []
+
+    async def predict(rows: list[dict]) -> list[float]:
+        hours = [row["Hour"] for row in rows]
+        requests.append(hours)
+        if UNKNOWN_HOURS & set(hours):
+            request = httpx.Request("POST", "http://model/predict")
+            response = httpx.Response(500, text="Found unknown categories", request=request)
+            raise httpx.HTTPStatusError("unknown category", request=request, response=response)
+        return [hour / 2 for hour in hours]
+
+    monkeypatch.setattr(model_api, "predict", predict)
+    return requests
+
+
+def test_sweep_is_one_request(requests):
+    rows = sweep_prediction_input_data({"Hour": 8}, "Hour", [5, 6, 7])
+    assert asyncio.run(predict_sweep([5, 6, 7], rows)) == ([5, 6, 7], [2.5, 3.0, 3.5])
+    assert requests == [[5, 6, 7]]
+
+
+def test_rejected_values_are_left_out_of_the_sweep(requests):
+    values = list(range(6))
+    rows = sweep_prediction_input_data({"Hour": 8}, "Hour", values)
+    assert asyncio.run(predict_sweep(values, rows)) == ([0, 1, 4, 5], [0.0, 0.5, 2.0, 2.5])
+    assert requests[0] == values
+    assert sorted(requests[1:]) == [[value] for value in values]
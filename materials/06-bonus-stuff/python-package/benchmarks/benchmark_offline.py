@@ -0,0 +1,195 @@
+"""
+Throughput benchmark for `VesselsAPI` and the ETL pipeline, run against the
+offline stand-in for the WSDOT and Open-Meteo APIs in `tests/fake_api.py`.
+
+No network access or WSDOT access code is needed, and the fake serves the
+same data for the same settings, so runs can be compared with each other.
+Latency, data volume and rate limiting are set on the command line. The
+ETL is imported from `02-data-exploration-and-validation/etl`, so run the
+benchmark in that folder's environment.
+
+    python benchmarks/benchmark_offline.py
+    python benchmarks/benchmark_offline.py --latency-ms 200 --days 90 --max-workers 1 --max-workers 4
+    python benchmarks/benchmark_offline.py --rate-limit 10 --rate-limit-window 1 --skip-vessels-api
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+sys.path.append(str(Path(__file__).parents[1]))
+sys.path.append(str(Path(__file__).parents[1] / "tests"))
+sys.path.append(str(Path(__file__).parents[3] / "02-data-exploration-and-validation"))
+
+from fake_api import FakeAPI, FakeAPIConfig  # noqa: E402
+
+from ferryland.ferryland import VesselsAPI  # noqa: E402
+
+START_DATE = datetime.date(2024, 3, 1)
+
+
+def fake_config(args) -> FakeAPIConfig:
+    return FakeAPIConfig(
+        num_vessels=args.vessels,
+        num_terminals=args.terminals,
+        trips_per_vessel_per_day=args.trips_per_day,
+        latency_seconds=args.latency_ms / 1_000,
+        seconds_per_1000_rows=args.ms_per_1000_rows / 1_000,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+    )
+
+
+def benchmark_vessels_api(args) -> dict:
+    """
+    Download the vessel verbose data and the history of every vessel, one
+    request at a time, the way a script using `VesselsAPI` would.
+    """
+    end_date = START_DATE + datetime.timedelta(days=args.days - 1)
+    elapsed = []
+    for _ in range(args.repeat):
+        fake = FakeAPI(fake_config(args))
+        vessels_api = VesselsAPI(wsdot_access_code="fake", transport=fake.transport())
+        start = time.perf_counter()
+        vessel_verbose = vessels_api.vessel_verbose()
+        for vessel_name in vessel_verbose.get_column("VesselName"):
+            vessels_api.vessel_history(vessel_name, START_DATE, end_date)
+        elapsed.append(time.perf_counter() - start)
+
+    seconds = statistics.median(elapsed)
+    return {
+        "benchmark": "VesselsAPI",
+        "max_workers": 1,
+        "seconds": seconds,
+        "stage_seconds": None,
+        "critical_path_seconds": None,
+        "requests": fake.stats.requests,
+        "rate_limited": fake.stats.rate_limited,
+        "requests_per_second": fake.stats.requests / seconds,
+        "rows_per_second": fake.stats.rows / seconds,
+    }
+
+
+def critical_path(stages, results) -> float:
+    """
+    The duration of the slowest chain of dependent stages, the shortest the
+    pipeline could take with unlimited workers.
+    """
+    finish: dict[str, float] = {}
+
+    def finish_time(stage) -> float:
+        if stage.name not in finish:
+            deps = [by_name[dep] for dep in stage.deps]
+            finish[stage.name] = (results[stage.name].seconds or 0.0) + max(
+                (finish_time(dep) for dep in deps), default=0.0
+            )
+        return finish[stage.name]
+
+    by_name = {stage.name: stage for stage in stages}
+    return max(finish_time(stage) for stage in stages)
+
+
+def benchmark_etl(args, max_workers: int) -> dict:
+    from etl.fetch import Sources
+    from etl.runner import run_stages
+    from etl.stages import build_stages, parquet_writer
+
+    end_date = START_DATE + datetime.timedelta(days=args.days - 1)
+    runs = []
+    for _ in range(args.repeat):
+        fake = FakeAPI(fake_config(args))
+        sources = Sources(
+            wsdot_access_code="fake",
+            transport=fake.transport(),
+            rate_limit_wait_seconds=args.rate_limit_window,
+        )
+        with tempfile.TemporaryDirectory() as output_dir:
+            stages = build_stages(
+                sources,
+                username="benchmark",
+                write_table=parquet_writer(output_dir),
+                start_date=START_DATE,
+                end_date=end_date,
+            )
+            start = time.perf_counter()
+            # The fetch stages print a line for each rate limited request.
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = run_stages(stages, max_workers=max_workers)
+            seconds = time.perf_counter() - start
+
+        failed = [result for result in results.values() if result.status != "done"]
+        if failed:
+            raise RuntimeError(
+                f"Stage {failed[0].name} {failed[0].status}: {failed[0].error!r}"
+            )
+        runs.append((seconds, stages, results, fake.stats))
+
+    seconds, stages, results, stats = sorted(runs, key=lambda run: run[0])[
+        len(runs) // 2
+    ]
+    return {
+        "benchmark": "ETL",
+        "max_workers": max_workers,
+        "seconds": seconds,
+        "stage_seconds": sum(result.seconds for result in results.values()),
+        "critical_path_seconds": critical_path(stages, results),
+        "requests": stats.requests,
+        "rate_limited": stats.rate_limited,
+        "requests_per_second": stats.requests / seconds,
+        "rows_per_second": stats.rows / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vessels", type=int, default=21)
+    parser.add_argument("--terminals", type=int, default=20)
+    parser.add_argument("--trips-per-day", type=int, default=16)
+    parser.add_argument(
+        "--days", type=int, default=28, help="Length of the date range downloaded."
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=50, help="Latency of every response."
+    )
+    parser.add_argument(
+        "--ms-per-1000-rows",
+        type=float,
+        default=0,
+        help="Extra latency for the records returned.",
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, help="Weather requests allowed per rate limit window."
+    )
+    parser.add_argument("--rate-limit-window", type=float, default=1.0)
+    parser.add_argument("--max-workers", action="append", type=int)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Report the median of this many runs."
+    )
+    parser.add_argument("--skip-vessels-api", action="store_true")
+    parser.add_argument("--skip-etl", action="store_true")
+    args = parser.parse_args()
+    args.max_workers = args.max_workers or [1, 8]
+
+    results = []
+    if not args.skip_vessels_api:
+        results.append(benchmark_vessels_api(args))
+    if not args.skip_etl:
+        for max_workers in args.max_workers:
+            results.append(benchmark_etl(args, max_workers))
+
+    with pl.Config(
+        tbl_rows=-1, tbl_cols=-1, float_precision=2, thousands_separator=True
+    ):
+        print(pl.DataFrame(results))
+
+
+if __name__ == "__main__":
+    main()
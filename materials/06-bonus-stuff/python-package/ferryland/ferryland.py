@@ -16,6 +16,8 @@ class VesselsAPI:
     wsdot_access_code: str = field(
         default_factory=lambda: os.environ["WSDOT_ACCESS_CODE"]
     )
+    # Passed on to httpx, e.g. to serve the requests without the network.
+    transport: httpx.BaseTransport | None = None
     params: dict = field(init=False)
 
     def __post_init__(self):
@@ -23,7 +25,10 @@ class VesselsAPI:
 
     def call_api(self, endpoint: str, timeout: float = 10.0) -> pl.DataFrame:
         with httpx.Client(
-            base_url=self.base_url, params=self.params, timeout=timeout
+            base_url=self.base_url,
+            params=self.params,
+            timeout=timeout,
+            transport=self.transport,
         ) as client:
             r = client.get(endpoint)
             data = r.json()
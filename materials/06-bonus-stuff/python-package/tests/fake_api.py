@@ -0,0 +1,416 @@
+"""
+An offline stand-in for the WSDOT ferries API and the Open-Meteo archive
+API, served through `httpx.MockTransport`.
+
+Only the endpoints the workshop reads are served: `/vesselverbose`,
+`/vesselhistory/{vessel}/{start}/{end}`, `/terminallocations` and
+`/archive`. Requests are routed on the endpoint name in the path, so
+clients keep their real base URLs and only need the transport:
+
+    >>> fake = FakeAPI(FakeAPIConfig(num_vessels=3, latency_seconds=0.05))
+    >>> VesselsAPI(wsdot_access_code="fake", transport=fake.transport()).vessel_verbose()
+
+The data is synthetic but has the shape, types and quirks of the real
+responses (e.g. `/Date(...)/` timestamps, measurement strings, cancelled
+trips without an arriving terminal), and is the same for the same config.
+Columns that are null for some vessels are set for the first one, so that
+polars infers the same types as for the real data.
+"""
+
+import datetime
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import unquote
+
+import httpx
+
+# (name in the vessel history, name in the terminal locations, abbreviation,
+# latitude, longitude)
+TERMINALS = [
+    ("anacortes", "Anacortes", "ANA", 48.5074, -122.6793),
+    ("bainbridge", "Bainbridge Island", "BBI", 47.6230, -122.5113),
+    ("bremerton", "Bremerton", "BRE", 47.5620, -122.6243),
+    ("clinton", "Clinton", "CLI", 47.9751, -122.3510),
+    ("keystone", "Coupeville", "COU", 48.1596, -122.6729),
+    ("edmonds", "Edmonds", "EDM", 47.8131, -122.3853),
+    ("fauntleroy", "Fauntleroy", "FAU", 47.5232, -122.3963),
+    ("friday harbor", "Friday Harbor", "FRH", 48.5355, -123.0144),
+    ("kingston", "Kingston", "KIN", 47.7948, -122.4944),
+    ("lopez", "Lopez Island", "LOP", 48.5707, -122.8829),
+    ("mukilteo", "Mukilteo", "MUK", 47.9495, -122.3048),
+    ("orcas", "Orcas Island", "ORI", 48.5975, -122.9437),
+    ("pt. defiance", "Point Defiance", "PTD", 47.3062, -122.5144),
+    ("port townsend", "Port Townsend", "POT", 48.1106, -122.7597),
+    ("colman", "Seattle", "P52", 47.6026, -122.3398),
+    ("shaw", "Shaw Island", "SHI", 48.5845, -122.9296),
+    ("sidney b. c.", "Sidney B.C.", "SID", 48.6432, -123.3962),
+    ("southworth", "Southworth", "SOU", 47.5131, -122.4958),
+    ("tahlequah", "Tahlequah", "TAH", 47.3313, -122.5068),
+    ("vashon", "Vashon Island", "VAI", 47.5109, -122.4638),
+]
+
+ROUTES = [
+    ("colman", "bainbridge"),
+    ("colman", "bremerton"),
+    ("edmonds", "kingston"),
+    ("mukilteo", "clinton"),
+    ("fauntleroy", "vashon"),
+    ("fauntleroy", "southworth"),
+    ("pt. defiance", "tahlequah"),
+    ("port townsend", "keystone"),
+    ("anacortes", "friday harbor"),
+    ("anacortes", "orcas"),
+    ("anacortes", "lopez"),
+    ("anacortes", "shaw"),
+    ("anacortes", "sidney b. c."),
+]
+
+VESSEL_NAMES = [
+    "Cathlamet",
+    "Chelan",
+    "Chetzemoka",
+    "Chimacum",
+    "Issaquah",
+    "Kaleetan",
+    "Kennewick",
+    "Kitsap",
+    "Kittitas",
+    "Puyallup",
+    "Salish",
+    "Samish",
+    "Sealth",
+    "Spokane",
+    "Suquamish",
+    "Tacoma",
+    "Tillikum",
+    "Tokitae",
+    "Walla Walla",
+    "Wenatchee",
+    "Yakima",
+]
+
+# WSDOT timestamps carry the Pacific offset; the fake uses daylight time.
+PACIFIC = datetime.timezone(datetime.timedelta(hours=-7))
+
+
+@dataclass
+class FakeAPIConfig:
+    # Volume
+    num_vessels: int = len(VESSEL_NAMES)
+    num_terminals: int = len(TERMINALS)
+    trips_per_vessel_per_day: int = 16
+    cancelled_share: float = 0.01
+    # Latency: every response waits `latency_seconds`, plus
+    # `seconds_per_1000_rows` for the records it returns.
+    latency_seconds: float = 0.0
+    seconds_per_1000_rows: float = 0.0
+    # 429 behaviour: at most `rate_limit` requests per `rate_limit_window`
+    # seconds to the paths in `rate_limited_endpoints`; the rest get a 429
+    # with a Retry-After header.
+    rate_limit: int | None = None
+    rate_limit_window: float = 1.0
+    rate_limited_endpoints: tuple[str, ...] = ("archive",)
+    seed: int = 0
+
+
+@dataclass
+class FakeAPIStats:
+    requests: int = 0
+    rate_limited: int = 0
+    rows: int = 0
+    by_endpoint: dict[str, int] = field(default_factory=dict)
+
+
+class FakeAPI:
+    """
+    The request handler of the stand-in. It is safe to use from several
+    threads, and counts the requests, 429s and records it served in
+    `stats`.
+    """
+
+    def __init__(self, config: FakeAPIConfig | None = None):
+        self.config = config or FakeAPIConfig()
+        if self.config.num_terminals > len(TERMINALS):
+            raise ValueError(f"The fake knows {len(TERMINALS)} terminals")
+        self.stats = FakeAPIStats()
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        parts = [unquote(part) for part in request.url.path.strip("/").split("/")]
+        endpoint_index = next(
+            (
+                index
+                for index, part in enumerate(parts)
+                if part.lower()
+                in ("vesselverbose", "vesselhistory", "terminallocations", "archive")
+            ),
+            None,
+        )
+        if endpoint_index is None:
+            return httpx.Response(404, json={"Message": "No HTTP resource was found."})
+        endpoint, args = parts[endpoint_index].lower(), parts[endpoint_index + 1 :]
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.by_endpoint[endpoint] = (
+                self.stats.by_endpoint.get(endpoint, 0) + 1
+            )
+            retry_after = self._rate_limited(endpoint)
+            if retry_after is not None:
+                self.stats.rate_limited += 1
+        if retry_after is not None:
+            return httpx.Response(
+                429,
+                headers={"Retry-After": f"{retry_after:.3f}"},
+                json={"error": True, "reason": "Too many concurrent requests"},
+            )
+
+        if endpoint != "archive" and "apiaccesscode" not in request.url.params:
+            return httpx.Response(
+                400, json={"Message": "An API Access Code is required."}
+            )
+
+        if endpoint == "vesselverbose":
+            data = self.vessel_verbose()
+        elif endpoint == "vesselhistory" and args:
+            vessel_name, start, end = args
+            data = self.vessel_history(
+                vessel_name,
+                datetime.date.fromisoformat(start),
+                datetime.date.fromisoformat(end),
+            )
+        elif endpoint == "vesselhistory":
+            today = datetime.date.today()
+            data = [
+                trip
+                for vessel_name in self._vessel_names()
+                for trip in self.vessel_history(vessel_name, today, today)
+            ]
+        elif endpoint == "terminallocations":
+            data = self.terminal_locations()
+        else:
+            data = self.archive(request.url.params)
+
+        num_rows = len(data["hourly"]["time"]) if endpoint == "archive" else len(data)
+        with self._lock:
+            self.stats.rows += num_rows
+        time.sleep(
+            self.config.latency_seconds
+            + self.config.seconds_per_1000_rows * num_rows / 1000
+        )
+        return httpx.Response(200, json=data)
+
+    def _rate_limited(self, endpoint: str) -> float | None:
+        """
+        Count the request in the current window, returning how long to wait
+        if the window is full.
+        """
+        if (
+            self.config.rate_limit is None
+            or endpoint not in self.config.rate_limited_endpoints
+        ):
+            return None
+        now = time.monotonic()
+        if now - self._window_start >= self.config.rate_limit_window:
+            self._window_start, self._window_requests = now, 0
+        if self._window_requests >= self.config.rate_limit:
+            return self._window_start + self.config.rate_limit_window - now
+        self._window_requests += 1
+        return None
+
+    # Synthetic data ---------------------------------------------------------
+
+    def _vessel_names(self) -> list[str]:
+        names = VESSEL_NAMES[: self.config.num_vessels]
+        names += [f"Vessel {i + 1}" for i in range(len(names), self.config.num_vessels)]
+        return names
+
+    def vessel_verbose(self) -> list[dict]:
+        vessels = []
+        for vessel_id, name in enumerate(self._vessel_names(), start=1):
+            rng = random.Random(f"{self.config.seed}-{name}")
+            feet = rng.randint(200, 460)
+            vessels.append(
+                {
+                    "VesselID": vessel_id,
+                    "VesselSubjectID": vessel_id,
+                    "VesselName": name,
+                    "VesselAbbrev": name.replace(" ", "")[:3].upper(),
+                    "Class": {
+                        "ClassID": vessel_id % 7 + 1,
+                        "ClassSubjectID": vessel_id % 7 + 300,
+                        "ClassName": f"Class {vessel_id % 7 + 1}",
+                        "SortSeq": vessel_id % 7 * 10,
+                        "DrawingImg": f"https://www.wsdot.wa.gov/ferries/images/{vessel_id}.gif",
+                        "SilhouetteImg": f"https://www.wsdot.wa.gov/ferries/images/{vessel_id}-s.gif",
+                        "PublicDisplayName": f"Class {vessel_id % 7 + 1}",
+                    },
+                    "Status": 1,
+                    "OwnedByWSF": True,
+                    "CarDeckRestroom": rng.random() < 0.8,
+                    "CarDeckShelter": rng.random() < 0.3,
+                    "Elevator": True,
+                    "ADAAccessible": True,
+                    "MainCabinGalley": rng.random() < 0.9,
+                    "MainCabinRestroom": True,
+                    "PublicWifi": False,
+                    "ADAInfo": f"The MV {name} has elevator access.",
+                    "AdditionalInfo": ""
+                    if vessel_id == 1 or rng.random() < 0.5
+                    else None,
+                    "VesselNameDesc": f"{name} is named after a place in Washington.",
+                    "VesselHistory": " "
+                    if vessel_id == 1 or rng.random() < 0.5
+                    else None,
+                    "Beam": f"{rng.randint(50, 90)}' {rng.randint(1, 11)}\"",
+                    "CityBuilt": rng.choice(["Seattle", "Tacoma", "Portland"]),
+                    "SpeedInKnots": rng.randint(13, 18),
+                    "Draft": f"{rng.randint(12, 18)}'",
+                    "EngineCount": rng.choice([2, 4]),
+                    "Horsepower": rng.randrange(2500, 8000, 100),
+                    "Length": f"{feet}' {rng.randint(0, 11)}\"",
+                    "MaxPassengerCount": rng.randrange(150, 2000, 50),
+                    "PassengerOnly": False,
+                    "FastFerry": False,
+                    "PropulsionInfo": rng.choice(["DIESEL", "DIESEL-ELECTRIC (DC)"]),
+                    "TallDeckClearance": rng.choice([186, 192, 204]),
+                    "RegDeckSpace": rng.randint(30, 200),
+                    "TallDeckSpace": rng.randint(0, 60),
+                    "Tonnage": rng.randint(1000, 5000),
+                    "Displacement": rng.randint(1000, 6000),
+                    "YearBuilt": rng.randint(1959, 2018),
+                    "YearRebuilt": rng.randint(1990, 2010)
+                    if vessel_id == 1 or rng.random() < 0.5
+                    else None,
+                    "VesselDrawingImg": None,
+                    "SolasCertified": rng.random() < 0.2,
+                    "MaxPassengerCountForInternational": 1090
+                    if vessel_id == 1 or rng.random() < 0.2
+                    else None,
+                }
+            )
+        return vessels
+
+    def vessel_history(
+        self, vessel_name: str, start: datetime.date, end: datetime.date
+    ) -> list[dict]:
+        names = self._vessel_names()
+        if vessel_name not in names:
+            return []
+        departing, arriving = ROUTES[names.index(vessel_name) % len(ROUTES)]
+        rng = random.Random(f"{self.config.seed}-{vessel_name}-{start}-{end}")
+        trips_per_day = self.config.trips_per_vessel_per_day
+        # Sailings between 05:00 and 23:00 Pacific time.
+        spacing = datetime.timedelta(hours=18) / max(trips_per_day, 1)
+
+        trips = []
+        day = start
+        while day <= end:
+            first_sailing = datetime.datetime.combine(day, datetime.time(5), PACIFIC)
+            for trip in range(trips_per_day):
+                scheduled = first_sailing + trip * spacing
+                actual = scheduled + datetime.timedelta(
+                    seconds=rng.expovariate(1 / 300)
+                )
+                cancelled = rng.random() < self.config.cancelled_share
+                trips.append(
+                    {
+                        "VesselId": names.index(vessel_name) + 1,
+                        "Vessel": vessel_name,
+                        "Departing": (departing if trip % 2 == 0 else arriving).title(),
+                        "Arriving": None
+                        if cancelled
+                        else (arriving if trip % 2 == 0 else departing).title(),
+                        "ScheduledDepart": _wsdot_date(scheduled),
+                        "ActualDepart": _wsdot_date(actual),
+                        "EstArrival": None
+                        if cancelled
+                        else _wsdot_date(
+                            actual + datetime.timedelta(minutes=rng.randint(20, 60))
+                        ),
+                        "Date": _wsdot_date(scheduled),
+                    }
+                )
+            day += datetime.timedelta(days=1)
+        return trips
+
+    def terminal_locations(self) -> list[dict]:
+        return [
+            {
+                "TerminalID": terminal_id,
+                "TerminalSubjectID": terminal_id + 100,
+                "RegionID": terminal_id % 5 + 1,
+                "TerminalName": name,
+                "TerminalAbbrev": abbreviation,
+                "SortSeq": terminal_id * 10,
+                "AddressLineOne": f"{terminal_id} Ferry Dock",
+                "City": name,
+                "State": "WA",
+                "ZipCode": "98000",
+                "Country": "USA",
+                "Latitude": latitude,
+                "Longitude": longitude,
+                "DispGISZoomLoc": [
+                    {"Latitude": latitude, "Longitude": longitude, "ZoomLevel": zoom}
+                    for zoom in range(3)
+                ],
+            }
+            for terminal_id, (_, name, abbreviation, latitude, longitude) in enumerate(
+                TERMINALS[: self.config.num_terminals], start=1
+            )
+        ]
+
+    def archive(self, params: httpx.QueryParams) -> dict:
+        start = datetime.date.fromisoformat(params["start_date"])
+        end = datetime.date.fromisoformat(params["end_date"])
+        latitude, longitude = float(params["latitude"]), float(params["longitude"])
+        rng = random.Random(f"{self.config.seed}-{latitude}-{longitude}-{start}-{end}")
+        num_hours = ((end - start).days + 1) * 24
+        first_hour = datetime.datetime.combine(start, datetime.time())
+        variables = {
+            "weather_code": lambda: rng.choice([0, 1, 2, 3, 51, 61, 63]),
+            "temperature_2m": lambda: round(rng.gauss(12, 5), 1),
+            "precipitation": lambda: round(max(rng.gauss(0, 0.5), 0.0), 1),
+            "cloud_cover": lambda: rng.randint(0, 100),
+            "wind_speed_10m": lambda: round(abs(rng.gauss(10, 5)), 1),
+            "wind_direction_10m": lambda: rng.randint(0, 360),
+            "wind_gusts_10m": lambda: round(abs(rng.gauss(20, 8)), 1),
+        }
+        hourly_variables = params.get_list("hourly")
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "generationtime_ms": 0.5,
+            "utc_offset_seconds": 0,
+            "timezone": "GMT",
+            "timezone_abbreviation": "GMT",
+            "elevation": 5.0,
+            "hourly_units": {
+                "time": "iso8601",
+                **{name: "" for name in hourly_variables},
+            },
+            "hourly": {
+                "time": [
+                    (first_hour + datetime.timedelta(hours=hour)).strftime(
+                        "%Y-%m-%dT%H:%M"
+                    )
+                    for hour in range(num_hours)
+                ],
+                **{
+                    name: [variables[name]() for _ in range(num_hours)]
+                    for name in hourly_variables
+                },
+            },
+        }
+
+
+def _wsdot_date(value: datetime.datetime) -> str:
+    offset = value.strftime("%z")
+    return f"/Date({int(value.timestamp() * 1000)}{offset})/"
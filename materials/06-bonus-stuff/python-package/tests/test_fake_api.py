@@ -0,0 +1,52 @@
+import datetime
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_api import FakeAPI, FakeAPIConfig  # noqa: E402
+
+from ferryland.ferryland import VesselsAPI  # noqa: E402
+
+
+def test_vessels_api_offline():
+    fake = FakeAPI(FakeAPIConfig(num_vessels=3, trips_per_vessel_per_day=10))
+    vessels_api = VesselsAPI(wsdot_access_code="fake", transport=fake.transport())
+
+    vessel_verbose = vessels_api.vessel_verbose()
+    vessel_history = vessels_api.vessel_history(
+        vessel_name="Chetzemoka",
+        date_start=datetime.date(2024, 3, 1),
+        date_end=datetime.date(2024, 3, 7),
+    )
+
+    assert vessel_verbose.get_column("VesselName").to_list() == [
+        "Cathlamet",
+        "Chelan",
+        "Chetzemoka",
+    ]
+    assert vessel_history.shape == (70, 8)
+    assert vessel_history.get_column("ScheduledDepart").str.starts_with("/Date(").all()
+    assert fake.stats.requests == 2
+
+
+def test_weather_requests_are_rate_limited():
+    fake = FakeAPI(FakeAPIConfig(rate_limit=2, rate_limit_window=60))
+    params = {
+        "latitude": 47.6,
+        "longitude": -122.34,
+        "start_date": "2024-03-01",
+        "end_date": "2024-03-02",
+        "hourly": ["temperature_2m", "cloud_cover"],
+    }
+    with httpx.Client(
+        base_url="https://archive-api.open-meteo.com/v1/", transport=fake.transport()
+    ) as client:
+        responses = [client.get("/archive", params=params) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert 0 < float(responses[2].headers["Retry-After"]) <= 60
+    assert len(responses[0].json()["hourly"]["cloud_cover"]) == 48
+    assert fake.stats.rate_limited == 1
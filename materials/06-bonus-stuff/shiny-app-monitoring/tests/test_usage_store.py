@@ -0,0 +1,145 @@
+import json
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from posit.connect import Client
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+import usage_store  # noqa: E402
+
+CONTENT_GUID = "ff62e112-8cec-4c9a-acdb-099ed2c4dec3"
+
+
+class FakeConnect:
+    """
+    A stand-in for the Connect API's usage and user endpoints that records
+    the requests it gets.
+    """
+
+    def __init__(self):
+        self.visits: list[dict] = []
+        self.shiny_usage: list[dict] = []
+        self.users: list[dict] = []
+        self.requests: list[tuple[str, dict]] = []
+
+    def add_visit(self, time: str, user_guid: str | None) -> None:
+        self.visits.append(
+            {
+                "content_guid": CONTENT_GUID,
+                "user_guid": user_guid,
+                "variant_key": None,
+                "rendering_id": None,
+                "bundle_id": 1,
+                "time": time,
+                "data_version": 1,
+                "path": "/",
+            }
+        )
+
+    def add_user(self, guid: str, username: str) -> None:
+        self.users.append({"guid": guid, "username": username, "email": f"{username}@posit.co"})
+
+    def handle(self, path: str, params: dict) -> dict:
+        self.requests.append((path, params))
+        if path.endswith("/v1/users"):
+            size = int(params["page_size"])
+            offset = (int(params["page_number"]) - 1) * size
+            return {
+                "results": self.users[offset : offset + size],
+                "current_page": int(params["page_number"]),
+                "total": len(self.users),
+            }
+
+        events = self.visits if path.endswith("/visits") else self.shiny_usage
+        time_field = "time" if path.endswith("/visits") else "started"
+        matching = [
+            event
+            for event in events
+            if params["from"] <= event[time_field] <= params["to"]
+        ]
+        offset, limit = int(params.get("next", 0)), int(params["limit"])
+        has_next = offset + limit < len(matching)
+        return {
+            "paging": {"cursors": {"next": str(offset + limit) if has_next else None}},
+            "results": matching[offset : offset + limit],
+        }
+
+
+@pytest.fixture
+def fake_connect():
+    fake = FakeConnect()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            body = json.dumps(fake.handle(url.path, params)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fake.url = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+
+
+@pytest.fixture
+def client(fake_connect):
+    with Client(api_key="key", url=fake_connect.url) as client:
+        yield client
+
+
+def test_only_new_events_are_fetched(fake_connect, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(usage_store, "PAGE_SIZE", 2)
+    con = usage_store.connect(str(tmp_path / "usage.duckdb"))
+    start, end = datetime(2024, 7, 1), datetime(2024, 8, 1)
+    for day in range(1, 6):
+        fake_connect.add_visit(f"2024-07-0{day}T12:00:00Z", "user-1")
+
+    assert usage_store.ingest_usage(client, con, CONTENT_GUID, start, end) == 5
+
+    # only the newest stored event is fetched again
+    fake_connect.add_visit("2024-07-06T12:00:00Z", None)
+    fake_connect.add_visit("2024-07-07T12:00:00Z", "user-1")
+    assert usage_store.ingest_usage(client, con, CONTENT_GUID, start, end) == 3
+    visit_requests = [params for path, params in fake_connect.requests if path.endswith("/visits")]
+    assert visit_requests[-1]["from"] == "2024-07-05T12:00:00Z"
+    # the first page of each fetch is requested without a cursor
+    first_pages = [params for params in visit_requests if "next" not in params]
+    assert [params["from"] for params in first_pages] == [
+        visit_requests[0]["from"],
+        "2024-07-05T12:00:00Z",
+    ]
+
+    usage = usage_store.read_usage(con, CONTENT_GUID, start, end)
+    assert usage.height == 7
+    assert usage["started"].is_unique().all()
+
+
+def test_user_directory_is_cached(fake_connect, client, tmp_path):
+    con = usage_store.connect(str(tmp_path / "usage.duckdb"))
+    start, end = datetime(2024, 7, 1), datetime(2099, 1, 1)
+    fake_connect.add_user("user-1", "ferry_fan")
+
+    assert usage_store.refresh_users(client, con)
+    assert not usage_store.refresh_users(client, con)
+
+    # a visit, after the directory was fetched, from a user who isn't in it
+    fake_connect.add_user("user-2", "new_fan")
+    fake_connect.add_visit(f"{datetime.now().year + 1}-01-01T00:00:00Z", "user-2")
+    usage_store.ingest_usage(client, con, CONTENT_GUID, start, end)
+
+    assert usage_store.refresh_users(client, con)
+    assert usage_store.read_users(con)["username"].sort().to_list() == ["ferry_fan", "new_fan"]
@@ -0,0 +1,246 @@
+"""
+A local copy of a content item's usage events and of the Connect user
+directory, kept in a DuckDB file so that rendering the report only asks
+Connect for what is new.
+
+`client.metrics.usage.find(...)` fetches every event in the report's window
+into memory on every render, and `client.users.find()` every user. Here the
+events are fetched page by page, starting from the newest event already
+stored, and each page is written to the store as it arrives. The user
+directory is fetched again only when it is older than `USERS_MAX_AGE` or
+when an event references a user it doesn't have.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import duckdb
+import polars as pl
+import pyarrow as pa
+
+USAGE_STORE = os.getenv("USAGE_STORE", "usage.duckdb")
+
+USERS_MAX_AGE = timedelta(hours=int(os.getenv("USAGE_STORE_USERS_MAX_AGE_HOURS", 24)))
+
+# The largest page the Connect API returns.
+PAGE_SIZE = 500
+
+# The usage event endpoints, and the field of each that holds the event time.
+SOURCES = {
+    "visits": ("v1/instrumentation/content/visits", "time"),
+    "shiny": ("v1/instrumentation/shiny/usage", "started"),
+}
+
+EVENT_SCHEMA = pa.schema(
+    [
+        ("source", pa.string()),
+        ("content_guid", pa.string()),
+        ("user_guid", pa.string()),
+        ("started", pa.timestamp("us")),
+        ("ended", pa.timestamp("us")),
+        ("data_version", pa.int64()),
+        ("path", pa.string()),
+    ]
+)
+
+USER_COLUMNS = ["guid", "username", "first_name", "last_name", "email"]
+
+
+def connect(path: str = USAGE_STORE) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(path)
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_events (
+            source TEXT,
+            content_guid TEXT,
+            user_guid TEXT,
+            started TIMESTAMP,
+            ended TIMESTAMP,
+            data_version BIGINT,
+            path TEXT
+        )
+        """
+    )
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS users (
+            {", ".join(f"{column} TEXT" for column in USER_COLUMNS)},
+            fetched_at TIMESTAMP
+        )
+        """
+    )
+    return con
+
+
+def _timestamp(value: str | None) -> datetime | None:
+    """
+    A Connect timestamp ("2024-07-01T12:00:00Z") as a naive UTC datetime.
+    """
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _api_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def fetch_event_pages(client, path: str, params: dict) -> Iterator[list[dict]]:
+    """
+    Follow the `paging.cursors.next` cursor of a usage endpoint, yielding
+    each page of events.
+    """
+    cursor = None
+    while True:
+        page_params = {**params, "limit": PAGE_SIZE}
+        if cursor:
+            page_params["next"] = cursor
+        response = client.get(path, params=page_params)
+        response.raise_for_status()
+        page = response.json()
+        yield page["results"]
+        cursor = page["paging"].get("cursors", {}).get("next")
+        if not cursor:
+            return
+
+
+def _event_table(source: str, time_field: str, events: list[dict]) -> pa.Table:
+    return pa.Table.from_pylist(
+        [
+            {
+                "source": source,
+                "content_guid": event["content_guid"],
+                "user_guid": event.get("user_guid"),
+                "started": _timestamp(event[time_field]),
+                "ended": _timestamp(event.get("ended", event[time_field])),
+                "data_version": event.get("data_version"),
+                "path": event.get("path"),
+            }
+            for event in events
+        ],
+        schema=EVENT_SCHEMA,
+    )
+
+
+def _insert(con, table_name: str, rows: pa.Table) -> None:
+    con.register("_rows", rows)
+    try:
+        con.execute(f"INSERT INTO {table_name} SELECT * FROM _rows")
+    finally:
+        con.unregister("_rows")
+
+
+def latest_event_time(con, content_guid: str, source: str) -> datetime | None:
+    return con.execute(
+        "SELECT max(started) FROM usage_events WHERE content_guid = ? AND source = ?",
+        [content_guid, source],
+    ).fetchone()[0]
+
+
+def ingest_usage(client, con, content_guid: str, start: datetime, end: datetime) -> int:
+    """
+    Store the events of `content_guid` between `start` and `end` that aren't
+    stored yet. Returns the number of events fetched.
+
+    Events are fetched from the newest stored event onwards (or from `start`
+    if that is later). The API returns them oldest first, and each page is
+    committed as it arrives, so an interrupted ingestion resumes from the
+    last page it stored. Events at exactly the newest stored time are
+    deleted and fetched again, since more of them may have been recorded
+    since.
+    """
+    num_events = 0
+    for source, (path, time_field) in SOURCES.items():
+        latest = latest_event_time(con, content_guid, source)
+        since = max(latest, start) if latest else start
+        params = {"content_guid": content_guid, "from": _api_time(since), "to": _api_time(end)}
+
+        con.begin()
+        con.execute(
+            "DELETE FROM usage_events WHERE content_guid = ? AND source = ? AND started >= ?",
+            [content_guid, source, since],
+        )
+        for events in fetch_event_pages(client, path, params):
+            page = _event_table(source, time_field, events)
+            _insert(con, "usage_events", page)
+            con.commit()
+            con.begin()
+            num_events += page.num_rows
+        con.commit()
+    return num_events
+
+
+def fetch_users(client) -> Iterator[dict]:
+    """
+    Every user, following the page numbers of the users endpoint.
+    """
+    page_number = 1
+    num_fetched = 0
+    while True:
+        response = client.get(
+            "v1/users", params={"page_number": page_number, "page_size": PAGE_SIZE}
+        )
+        response.raise_for_status()
+        page = response.json()
+        yield from page["results"]
+        num_fetched += len(page["results"])
+        if not page["results"] or num_fetched >= page["total"]:
+            return
+        page_number += 1
+
+
+def refresh_users(client, con, max_age: timedelta = USERS_MAX_AGE) -> bool:
+    """
+    Fetch the user directory again if it is older than `max_age`, or if an
+    event since it was fetched references a user that isn't in it (users who
+    were deleted before then won't turn up by fetching it again). Returns
+    whether it was fetched.
+    """
+    fetched_at, num_unknown = con.execute(
+        """
+        WITH directory AS (SELECT min(fetched_at) AS fetched_at FROM users)
+        SELECT
+            (SELECT fetched_at FROM directory),
+            (SELECT count(DISTINCT user_guid) FROM usage_events
+             WHERE started >= (SELECT fetched_at FROM directory)
+             AND user_guid NOT IN (SELECT guid FROM users))
+        """
+    ).fetchone()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if fetched_at is not None and now - fetched_at < max_age and num_unknown == 0:
+        return False
+
+    users = pa.Table.from_pylist(
+        [
+            {**{column: user.get(column) for column in USER_COLUMNS}, "fetched_at": now}
+            for user in fetch_users(client)
+        ],
+        schema=pa.schema(
+            [*((column, pa.string()) for column in USER_COLUMNS), ("fetched_at", pa.timestamp("us"))]
+        ),
+    )
+    con.begin()
+    con.execute("DELETE FROM users")
+    _insert(con, "users", users)
+    con.commit()
+    return True
+
+
+def read_usage(con, content_guid: str, start: datetime, end: datetime) -> pl.DataFrame:
+    """
+    The stored events of `content_guid` between `start` and `end`, in the
+    layout of `client.metrics.usage.find(...)`.
+    """
+    return con.execute(
+        """
+        SELECT * EXCLUDE (source) FROM usage_events
+        WHERE content_guid = ? AND started >= ? AND started < ?
+        ORDER BY started
+        """,
+        [content_guid, start, end],
+    ).pl()
+
+
+def read_users(con) -> pl.DataFrame:
+    return con.execute(f"SELECT {', '.join(USER_COLUMNS)} FROM users").pl()